@@ -3,6 +3,9 @@ import uvicorn as uvicorn
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from auth.database import async_session_maker
+from cache.cache import get_cache_instance, close_cache_pool
+from cache.genres import genres_dictionary
 from config import FRONTEND_ORIGIN, BACKEND_HOST, BACKEND_PORT
 from routes.auth_router import auth_router, register_router, reset_password_router, verify_router
 from routes.authors_router import authors_router
@@ -80,5 +83,17 @@ app.include_router(
 )
 
 
+@app.on_event("startup")
+async def startup():
+    # Load genres dictionary before the first request
+    async with async_session_maker() as session:
+        await genres_dictionary.get(session, get_cache_instance())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_cache_pool()
+
+
 if __name__ == '__main__':
     uvicorn.run(app=app, host=f"{BACKEND_HOST}", port=BACKEND_PORT)
\ No newline at end of file
@@ -7,7 +7,6 @@ from typing import Optional
 
 from fastapi import Depends, Request, HTTPException
 from fastapi_users import BaseUserManager, IntegerIDMixin, schemas, models, exceptions
-from redis import StrictRedis
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
 from auth.database import get_user_db, get_async_session
@@ -60,8 +59,7 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, uuid.UUID]):
         alphabet = string.ascii_letters + string.digits
         while True:
             reset_code = ''.join([secrets.choice(alphabet) for _ in range(5)])
-            if cache.get(reset_code) is None:
-                cache.set(reset_code, token, ex=MAIL_SERVICE_TOKEN_EXPIRATION_TIME)
+            if await cache.set(reset_code, token, ex=MAIL_SERVICE_TOKEN_EXPIRATION_TIME, nx=True):
                 break
         msg = EmailMessage()
         msg.set_content(
@@ -85,8 +83,7 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, uuid.UUID]):
         cache = get_cache_instance()
         while True:
             reset_code = secrets.token_hex(6)
-            if cache.get(reset_code) is None:
-                cache.set(reset_code, token, ex=MAIL_SERVICE_TOKEN_EXPIRATION_TIME)
+            if await cache.set(reset_code, token, ex=MAIL_SERVICE_TOKEN_EXPIRATION_TIME, nx=True):
                 break
         msg = EmailMessage()
         msg.set_content(
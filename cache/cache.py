@@ -1,10 +1,184 @@
-import redis
+import asyncio
+import json
+from typing import Dict, Iterable, List, Tuple, Type, TypeVar, Union
+
+from pydantic import BaseModel
+from redis import RedisError, TimeoutError as RedisTimeoutError
+from redis import asyncio as aioredis
+from redis.asyncio.client import Pipeline
 
 from config import CACHE_HOST, CACHE_HOST_PORT, CACHE_PASS
 
 
-pool = redis.ConnectionPool(host=CACHE_HOST, port=CACHE_HOST_PORT, decode_responses=True, password=CACHE_PASS)
+# Timeout of a single cache call (or pipeline execution) in seconds
+CACHE_CALL_TIMEOUT = 0.5
+
+pool = aioredis.ConnectionPool(host=CACHE_HOST, port=CACHE_HOST_PORT, decode_responses=True, password=CACHE_PASS,
+                               socket_connect_timeout=CACHE_CALL_TIMEOUT, socket_timeout=CACHE_CALL_TIMEOUT)
+
+# Version of cached documents format (bump it on response models change to drop all stale documents)
+CACHE_VERSION = 3
+
+# Lifetime of cached documents in seconds
+CACHE_EXPIRATION_TIME = 60 * 60
+
+Model = TypeVar("Model", bound=BaseModel)
+Dependency = Tuple[str, int]
+
+
+async def _with_timeout(awaitable, timeout: float):
+    # Slow cache must not hold the request, so calls time out as regular Redis errors
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise RedisTimeoutError(f"Cache call timed out after {timeout} seconds")
+
+
+class CachePipeline:
+    # Commands are buffered by underlying pipeline and sent in a single round trip on execute
+
+    def __init__(self, pipeline: Pipeline, timeout: float):
+        self.pipeline = pipeline
+        self.timeout = timeout
+
+    def __getattr__(self, name):
+        return getattr(self.pipeline, name)
+
+    async def execute(self, timeout: Union[None, float] = None):
+        async with self.pipeline as pipeline:
+            return await _with_timeout(pipeline.execute(), timeout or self.timeout)
+
+
+class Cache:
+    # Non-blocking cache facade with per-call timeouts
+
+    def __init__(self, client: aioredis.Redis, timeout: float = CACHE_CALL_TIMEOUT):
+        self.client = client
+        self.timeout = timeout
+
+    async def get(self, key: str, timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.get(key), timeout or self.timeout)
+
+    async def set(self, key: str, value, ex: Union[None, int] = None, nx: bool = False,
+                  timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.set(key, value, ex=ex, nx=nx), timeout or self.timeout)
+
+    async def mget(self, keys: List[str], timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.mget(keys), timeout or self.timeout)
+
+    async def incr(self, key: str, timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.incr(key), timeout or self.timeout)
+
+    async def getdel(self, key: str, timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.getdel(key), timeout or self.timeout)
+
+    async def zrevrange(self, key: str, start: int, end: int, withscores: bool = False,
+                        timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.zrevrange(key, start, end, withscores=withscores),
+                                   timeout or self.timeout)
+
+    async def delete(self, *keys: str, timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.delete(*keys), timeout or self.timeout)
+
+    async def zadd(self, key: str, mapping: Dict[str, float], timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.zadd(key, mapping), timeout or self.timeout)
+
+    async def rename(self, source: str, destination: str, timeout: Union[None, float] = None):
+        return await _with_timeout(self.client.rename(source, destination), timeout or self.timeout)
+
+    def pipeline(self, transaction: bool = True) -> CachePipeline:
+        return CachePipeline(self.client.pipeline(transaction=transaction), self.timeout)
+
+
+def get_cache_instance() -> Cache:
+    return Cache(aioredis.Redis(connection_pool=pool))
+
+
+def get_job_cache_instance(timeout: float) -> Cache:
+    # Jobs writing large values get a dedicated connection without socket timeout, so that slow reads and writes
+    # are bounded by the call timeout only (close it with `await cache.client.aclose()`)
+    client = aioredis.Redis(host=CACHE_HOST, port=CACHE_HOST_PORT, decode_responses=True, password=CACHE_PASS,
+                            socket_connect_timeout=CACHE_CALL_TIMEOUT, socket_timeout=None)
+    return Cache(client, timeout)
+
+
+async def close_cache_pool():
+    await pool.disconnect()
+
+
+def document_key(path: str) -> str:
+    return f"v{CACHE_VERSION}:documents:{path}"
+
+
+def dependency_key(dependency: Dependency) -> str:
+    entity, entity_id = dependency
+    return f"v{CACHE_VERSION}:dependencies:{entity}:{entity_id}"
+
+
+def parse_cached_document(from_cache: Union[None, str], model: Type[Model],
+                          version: Union[None, str] = None) -> Union[None, Model]:
+    # Documents are stored with version of the data they were built from, document of another version
+    # (e.g. built from data read before a concurrent change) is treated as a miss
+    if from_cache is None:
+        return None
+    from_cache = json.loads(from_cache)
+    if version is not None and from_cache["version"] != version:
+        return None
+    return model.model_validate(from_cache["document"])
+
+
+async def get_cached_document(cache: Cache, path: str, model: Type[Model],
+                              version: Union[None, str] = None) -> Union[None, Model]:
+    # Cache failures are treated as misses, so the database is the fallback
+    try:
+        from_cache = await cache.get(document_key(path))
+    except RedisError:
+        return None
+    return parse_cached_document(from_cache, model, version)
+
+
+async def get_cached_documents(cache: Cache, paths: List[str], model: Type[Model],
+                               versions: List[str]) -> List[Union[None, Model]]:
+    # Documents are fetched in a single round trip, missing ones and ones of other versions are returned as None
+    if len(paths) == 0:
+        return []
+    try:
+        from_cache = await cache.mget([document_key(path) for path in paths])
+    except RedisError:
+        return [None] * len(paths)
+    return [parse_cached_document(document, model, version) for document, version in zip(from_cache, versions)]
+
+
+async def set_cached_document(cache: Cache, path: str, document: BaseModel, dependencies: Iterable[Dependency],
+                              version: Union[None, str] = None):
+    # Document key is registered in the sets of every entity it embeds, so that change of
+    # any of those entities evicts the document. Sets live at least as long as their documents.
+    key = document_key(path)
+    pipe = cache.pipeline()
+    pipe.set(key, json.dumps({"version": version, "document": document.as_dict()}), ex=CACHE_EXPIRATION_TIME)
+    for dependency in set(dependencies):
+        pipe.sadd(dependency_key(dependency), key)
+        pipe.expire(dependency_key(dependency), CACHE_EXPIRATION_TIME)
+    try:
+        await pipe.execute()
+    except RedisError:
+        pass
 
 
-def get_cache_instance():
-    return redis.StrictRedis(connection_pool=pool)
+async def invalidate_cached_documents(cache: Cache, *dependencies: Dependency):
+    # Evict every cached document embedding any of the given entities
+    dependencies_keys = [dependency_key(dependency) for dependency in set(dependencies)]
+    if len(dependencies_keys) == 0:
+        return
+    try:
+        # Dependency sets are read and dropped atomically
+        pipe = cache.pipeline()
+        for key in dependencies_keys:
+            pipe.smembers(key)
+        pipe.delete(*dependencies_keys)
+        *documents_keys, _ = await pipe.execute()
+        documents_keys = set().union(*documents_keys)
+        if len(documents_keys) > 0:
+            await cache.delete(*documents_keys)
+    except RedisError:
+        pass
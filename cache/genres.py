@@ -0,0 +1,84 @@
+import time
+from typing import Dict, Iterable, NamedTuple, Union
+
+from redis import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache.cache import Cache, get_cache_instance
+from models.models import Genre
+
+# Key of genres version (bumped on every change of genres)
+GENRES_VERSION_KEY = "genres:version"
+
+# Minimal interval between genres version checks in seconds (bounds staleness of dictionaries of other workers)
+GENRES_VERSION_CHECK_INTERVAL = 5
+
+
+class GenreEntry(NamedTuple):
+    id: int
+    name: str
+
+
+class GenresDictionary:
+    # Per-worker map of genres by id. Genres version is read from cache at most once per check interval
+    # and the map is reloaded whenever version differs from the loaded one
+
+    def __init__(self):
+        self.genres: Dict[int, GenreEntry] = {}
+        self.version: Union[None, str] = None
+        self.loaded = False
+        self.checked_at = 0.0
+
+    async def get(self, session: AsyncSession, cache: Cache, ids: Iterable[int] = (),
+                  fresh: bool = False) -> Dict[int, GenreEntry]:
+        # Version is checked once per interval, or at once when fresh map is required (documents going to cache,
+        # validation before writes) or some of the given genres are unknown (may have been created by another worker)
+        now = time.monotonic()
+        check = not self.loaded or fresh or now - self.checked_at >= GENRES_VERSION_CHECK_INTERVAL or \
+            any(genre_id not in self.genres for genre_id in ids)
+        if not check:
+            return self.genres
+
+        version = await self.read_version(cache)
+        self.checked_at = now
+        if self.loaded and version is not None and version == self.version:
+            return self.genres
+
+        # Version is read before genres, so the loaded map is never older than its version
+        statement = select(Genre.id, Genre.name)
+        self.genres = {
+            genre_id: GenreEntry(genre_id, name) for genre_id, name in (await session.execute(statement)).all()
+        }
+        self.version = version
+        self.loaded = True
+
+        return self.genres
+
+    @staticmethod
+    async def read_version(cache: Cache) -> Union[None, str]:
+        # Version is unknown (and the map is reloaded on every check) while cache is unavailable
+        try:
+            version = await cache.get(GENRES_VERSION_KEY)
+            if version is None:
+                await cache.set(GENRES_VERSION_KEY, 0, nx=True)
+                version = await cache.get(GENRES_VERSION_KEY)
+            return version
+        except RedisError:
+            return None
+
+
+genres_dictionary = GenresDictionary()
+
+
+async def get_genres(session: AsyncSession, ids: Iterable[int] = (), fresh: bool = False) -> Dict[int, GenreEntry]:
+    return await genres_dictionary.get(session, get_cache_instance(), ids, fresh)
+
+
+async def bump_genres_version(cache: Cache):
+    # Dictionary of this worker is reloaded at once, other workers notice new version within check interval
+    genres_dictionary.loaded = False
+    try:
+        await cache.incr(GENRES_VERSION_KEY)
+    except RedisError:
+        pass
@@ -0,0 +1,141 @@
+import math
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from redis import RedisError
+from sqlalchemy import select, func, literal_column, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache.cache import Cache
+from models.models import Review
+
+# Decay time of review contribution to book trending score for every window (in seconds)
+TRENDING_WINDOWS = {
+    '7d': 7 * 24 * 60 * 60,
+    '30d': 30 * 24 * 60 * 60,
+}
+
+# Review contributes exp((created - TRENDING_EPOCH) / decay) to the score of its book, so order of books never
+# changes with time and only new reviews have to be added. Leaderboards keep logarithms of scores (they grow
+# linearly with time and never overflow), contributions are added and subtracted with log-sum-exp
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Books whose decayed score fell below this value are dropped from leaderboards
+TRENDING_MIN_SCORE = 1e-3
+
+# Number of books written to a rebuilt leaderboard with a single command
+TRENDING_REBUILD_CHUNK_SIZE = 10000
+
+# Adds (or subtracts) contribution to logarithmic score of a book and drops faded books atomically
+# KEYS[1] - leaderboard, ARGV[1] - book id, ARGV[2] - logarithm of contribution, ARGV[3] - sign,
+# ARGV[4] - minimal logarithmic score
+UPDATE_LOG_SCORE_SCRIPT = """
+local current = redis.call('ZSCORE', KEYS[1], ARGV[1])
+local weight = tonumber(ARGV[2])
+if ARGV[3] == '1' then
+    if current then
+        local score = tonumber(current)
+        local top = math.max(score, weight)
+        weight = top + math.log(math.exp(score - top) + math.exp(weight - top))
+    end
+    redis.call('ZADD', KEYS[1], weight, ARGV[1])
+elseif current then
+    local score = tonumber(current)
+    if weight >= score then
+        redis.call('ZREM', KEYS[1], ARGV[1])
+    else
+        redis.call('ZADD', KEYS[1], score + math.log(1 - math.exp(weight - score)), ARGV[1])
+    end
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[4])
+"""
+
+
+def trending_key(window: str) -> str:
+    return f"trending:log:{window}"
+
+
+def log_weight(created: datetime, window: str) -> float:
+    # Naive times are local (aware times are converted from their own time zone)
+    return (created.astimezone(timezone.utc) - TRENDING_EPOCH).total_seconds() / TRENDING_WINDOWS[window]
+
+
+def min_log_weight(window: str) -> float:
+    # Logarithmic weight of review created now whose contribution decayed down to the minimal score
+    return log_weight(datetime.now(timezone.utc), window) + math.log(TRENDING_MIN_SCORE)
+
+
+async def add_trending_review(cache: Cache, book_id: int, created: datetime, sign: int = 1):
+    # Add (or subtract on review deletion) review contribution to scores of the book, dropping faded books
+    try:
+        pipe = cache.pipeline()
+        for window in TRENDING_WINDOWS:
+            pipe.eval(UPDATE_LOG_SCORE_SCRIPT, 1, trending_key(window),
+                      book_id, log_weight(created, window), 1 if sign > 0 else -1, min_log_weight(window))
+        await pipe.execute()
+    except RedisError:
+        pass
+
+
+async def remove_trending_books(cache: Cache, *book_ids: int):
+    if len(book_ids) == 0:
+        return
+    pipe = cache.pipeline()
+    for window in TRENDING_WINDOWS:
+        pipe.zrem(trending_key(window), *book_ids)
+    try:
+        await pipe.execute()
+    except RedisError:
+        pass
+
+
+async def get_trending_scores(cache: Cache, window: str, limit: int) -> List[Tuple[int, float]]:
+    # Top books with their current decayed scores (leaderboard failures are treated as empty leaderboard)
+    try:
+        top = await cache.zrevrange(trending_key(window), 0, limit - 1, withscores=True)
+    except RedisError:
+        return []
+    now_log_weight = log_weight(datetime.now(timezone.utc), window)
+    return [(int(book_id), math.exp(log_score - now_log_weight)) for book_id, log_score in top]
+
+
+async def rebuild_trending_books(session: AsyncSession, cache: Cache) -> Dict[str, int]:
+    # Recompute leaderboards from reviews and swap them atomically, returns sizes of leaderboards
+    # (large leaderboards take long to write, so cache without socket timeout is expected)
+    sizes = {}
+    for window, decay in TRENDING_WINDOWS.items():
+        # Contributions of reviews older than the horizon are below the minimal score anyway
+        horizon = -math.log(TRENDING_MIN_SCORE) * decay
+        age = func.extract('epoch', Review.created) - TRENDING_EPOCH.timestamp()
+        weights = select(
+            Review.book_id,
+            (age / literal_column(str(decay), Float)).label("log_weight")
+        )\
+            .where(func.extract('epoch', func.now() - Review.created) < horizon)\
+            .subquery()
+
+        # Logarithm of sum of contributions is computed with log-sum-exp (exponents never exceed zero)
+        top = select(weights.c.book_id, func.max(weights.c.log_weight).label("top"))\
+            .group_by(weights.c.book_id)\
+            .subquery()
+        statement = select(
+            weights.c.book_id,
+            top.c.top + func.ln(func.sum(func.exp(weights.c.log_weight - top.c.top)))
+        )\
+            .join(top, top.c.book_id == weights.c.book_id)\
+            .group_by(weights.c.book_id, top.c.top)
+        scores = {book_id: float(score) for book_id, score in (await session.execute(statement)).all()}
+
+        # Scores are written to a temporary key in chunks (bounding size of every command) and then swapped
+        key = trending_key(window)
+        books_scores = list(scores.items())
+        await cache.delete(f"{key}:rebuild")
+        for start in range(0, len(books_scores), TRENDING_REBUILD_CHUNK_SIZE):
+            await cache.zadd(f"{key}:rebuild", dict(books_scores[start:start + TRENDING_REBUILD_CHUNK_SIZE]))
+        if len(books_scores) > 0:
+            await cache.rename(f"{key}:rebuild", key)
+        else:
+            await cache.delete(key)
+        sizes[window] = len(scores)
+
+    return sizes
@@ -4,7 +4,8 @@ from sqlalchemy import text, select
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from config import DB_USER, DB_PASS, DB_HOST, DB_HOST_PORT, DB_NAME
-from models import Role, Author, Book, Genre, GenreToBook, User, Collection, BookToCollection, Review
+from models.models import Role, Author, Book, Genre, GenreToBook, User, Collection, BookToCollection, Review
+from routes.utils.authors import refresh_authors_stats as refresh_authors_stats_of
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_HOST_PORT}/{DB_NAME}"
 
@@ -285,6 +286,24 @@ async def fill_reviews():
         await session.commit()
 
 
+async def refresh_books_reviews_stats():
+    async with async_session_maker() as session:
+        await session.execute(text(
+            'UPDATE "Books" SET rating_sum = stats.rating_sum, reviews_count = stats.reviews_count '
+            'FROM (SELECT book_id, sum(rating) AS rating_sum, count(*) AS reviews_count '
+            'FROM "Reviews" GROUP BY book_id) AS stats '
+            'WHERE stats.book_id = "Books".id'
+        ))
+        await session.commit()
+
+
+async def refresh_authors_stats():
+    async with async_session_maker() as session:
+        author_ids = (await session.execute(select(Author.id))).scalars().all()
+        await refresh_authors_stats_of(session, author_ids)
+        await session.commit()
+
+
 async def generate(force=False, users_created=False):
     await clear(force=force)
     if force:
@@ -297,7 +316,10 @@ async def generate(force=False, users_created=False):
         await fill_collections()
         # await fill_book_to_collections()
         await fill_reviews()
+        await refresh_books_reviews_stats()
+    await refresh_authors_stats()
 
 if __name__ == '__main__':
+    # Run from project root as `python -m models.fill_data_real`
     asyncio.run(generate(force=False, users_created=True))
 
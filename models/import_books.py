@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import sys
+
+from pydantic import ValidationError
+
+from auth.database import async_session_maker
+from cache.cache import get_cache_instance, invalidate_cached_documents, close_cache_pool
+from routes.models.books.create_book_model import CreateBookRequestModel
+from routes.utils.books import insert_books
+
+
+async def import_books(path: str, batch_size: int):
+    # Parse feed (one book per line in JSON format), malformed lines are reported and skipped
+    books = []
+    lines = []
+    with open(path, encoding="utf-8") as feed:
+        for line_number, line in enumerate(feed, start=1):
+            if line.strip() == "":
+                continue
+            try:
+                books.append(CreateBookRequestModel.model_validate_json(line))
+                lines.append(line_number)
+            except ValidationError as error:
+                print(f"Line {line_number}: {error.errors()[0]['msg']}", file=sys.stderr)
+
+    async with async_session_maker() as session:
+        created_ids, errors = await insert_books(session, books, batch_size)
+    for index, detail in errors.items():
+        print(f"Line {lines[index]}: {detail}", file=sys.stderr)
+
+    # Invalidate cache (author documents list author books)
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, *[('author', books[index].author_id) for index in created_ids])
+    await close_cache_pool()
+
+    print(f"Created {len(created_ids)} books")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import books from JSON lines feed "
+                                                 "(run from project root as `python -m models.import_books`)")
+    parser.add_argument("path", help="path to feed with one book per line")
+    parser.add_argument("--batch-size", type=int, default=1000, help="number of books committed at once")
+    args = parser.parse_args()
+    asyncio.run(import_books(args.path, args.batch_size))
@@ -1,11 +1,16 @@
 import enum
 
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
-from sqlalchemy import MetaData, Table, Column, Integer, Identity, String, ForeignKey, Enum, DateTime, func
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import MetaData, Table, Column, Integer, Identity, String, ForeignKey, Enum, DateTime, func, \
+    Computed, Index, Float, Boolean, true
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import declarative_base, deferred
 
 Base = declarative_base()
 
+# Text search configuration used for books full-text search (catalog is mostly in Russian)
+BOOKS_SEARCH_CONFIG = "russian"
+
 
 class Role(Base):
     __tablename__ = "Roles"
@@ -33,6 +38,27 @@ class Author(Base):
     id = Column("id", Integer, Identity(start=1, increment=1), primary_key=True)
     name = Column("name", String, nullable=False)
     about = Column("about", String, nullable=False)
+    version = Column("version", Integer, nullable=False, default=1, server_default="1")
+    # Stats of author books (kept up to date by books and reviews handlers)
+    books_count = Column("books_count", Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column("rating_sum", Integer, nullable=False, default=0, server_default="0")
+    reviews_count = Column("reviews_count", Integer, nullable=False, default=0, server_default="0")
+    rating = Column("rating", Float, Computed(
+        "CASE WHEN reviews_count > 0 THEN rating_sum::double precision / reviews_count ELSE 0 END",
+        persisted=True
+    ), nullable=False)
+    first_year = Column("first_year", Integer, nullable=True)
+    last_year = Column("last_year", Integer, nullable=True)
+
+    __table_args__ = (
+        # Authors list sorting keys (author id is a tie-breaker of keyset pagination)
+        Index("ix_Authors_name_id", "name", "id"),
+        Index("ix_Authors_books_count_id", "books_count", "id"),
+        Index("ix_Authors_rating_id", "rating", "id"),
+        Index("ix_Authors_reviews_count_id", "reviews_count", "id"),
+        # Authors search by name similarity
+        Index("ix_Authors_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
 
 class Book(Base):
@@ -43,6 +69,29 @@ class Book(Base):
     year = Column("year", Integer, nullable=False)
     author_id = Column("author_id", ForeignKey("Authors.id", ondelete="CASCADE"), nullable=False)
     annotation = Column("annotation", String, nullable=True)
+    version = Column("version", Integer, nullable=False, default=1, server_default="1")
+    rating_sum = Column("rating_sum", Integer, nullable=False, default=0, server_default="0")
+    reviews_count = Column("reviews_count", Integer, nullable=False, default=0, server_default="0")
+    rating = Column("rating", Float, Computed(
+        "CASE WHEN reviews_count > 0 THEN rating_sum::double precision / reviews_count ELSE 0 END",
+        persisted=True
+    ), nullable=False)
+    similar_stale = Column("similar_stale", Boolean, nullable=False, default=True, server_default=true())
+    search_vector = deferred(Column("search_vector", TSVECTOR, Computed(
+        f"setweight(to_tsvector('{BOOKS_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{BOOKS_SEARCH_CONFIG}', coalesce(annotation, '')), 'B')",
+        persisted=True
+    )))
+
+    __table_args__ = (
+        Index("ix_Books_search_vector", "search_vector", postgresql_using="gin"),
+        # Books list sorting keys (book id is a tie-breaker of keyset pagination)
+        Index("ix_Books_title_id", "title", "id"),
+        Index("ix_Books_year_id", "year", "id"),
+        Index("ix_Books_rating_id", "rating", "id"),
+        Index("ix_Books_reviews_count_id", "reviews_count", "id"),
+        Index("ix_Books_author_id", "author_id"),
+    )
 
 
 class Collection(Base):
@@ -51,6 +100,11 @@ class Collection(Base):
     id = Column("id", Integer, Identity(start=1, increment=1), primary_key=True)
     title = Column("title", String, nullable=False)
     user_id = Column("user_id", ForeignKey("Users.id", ondelete="CASCADE"), nullable=False)
+    version = Column("version", Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        Index("ix_Collections_user_id", "user_id"),
+    )
 
 
 class Review(Base):
@@ -61,7 +115,11 @@ class Review(Base):
     book_id = Column("book_id", ForeignKey("Books.id", ondelete="CASCADE"), nullable=False)
     rating = Column("rating", Integer, nullable=False)
     text = Column("text", String, nullable=False)
-    created = Column(DateTime(timezone=True), server_default=func.now())
+    created = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_Reviews_book_id_created_id", "book_id", "created", "id"),
+    )
 
 
 class BookToCollection(Base):
@@ -71,12 +129,19 @@ class BookToCollection(Base):
     collection_id = Column("collection_id", ForeignKey("Collections.id", ondelete="CASCADE"), nullable=False)
     book_id = Column("book_id", ForeignKey("Books.id", ondelete="CASCADE"), nullable=False)
 
+    __table_args__ = (
+        # Collection books in the order of addition
+        Index("ix_Books_Collections_collection_id_id", "collection_id", "id"),
+        Index("ix_Books_Collections_book_id", "book_id"),
+    )
+
 
 class Genre(Base):
     __tablename__ = "Genres"
 
     id = Column("id", Integer, Identity(start=1, increment=1), primary_key=True)
     name = Column("name", String, nullable=False)
+    version = Column("version", Integer, nullable=False, default=1, server_default="1")
 
 
 class GenreToBook(Base):
@@ -84,4 +149,23 @@ class GenreToBook(Base):
 
     id = Column("id", Integer, Identity(start=1, increment=1), primary_key=True)
     genre_id = Column("genre_id", ForeignKey("Genres.id", ondelete="CASCADE"), nullable=False)
-    book_id = Column("book_id", ForeignKey("Books.id", ondelete="CASCADE"), nullable=False)
\ No newline at end of file
+    book_id = Column("book_id", ForeignKey("Books.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        Index("ix_Books_Genres_book_id_genre_id", "book_id", "genre_id"),
+        Index("ix_Books_Genres_genre_id_book_id", "genre_id", "book_id"),
+    )
+
+
+class SimilarBook(Base):
+    __tablename__ = "Similar Books"
+
+    id = Column("id", Integer, Identity(start=1, increment=1), primary_key=True)
+    book_id = Column("book_id", ForeignKey("Books.id", ondelete="CASCADE"), nullable=False)
+    similar_book_id = Column("similar_book_id", ForeignKey("Books.id", ondelete="CASCADE"), nullable=False)
+    score = Column("score", Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_Similar_Books_book_id_score", "book_id", "score"),
+        Index("ix_Similar_Books_similar_book_id", "similar_book_id"),
+    )
\ No newline at end of file
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+from typing import Iterator, List, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select, update, delete, insert, func, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.database import async_session_maker
+from models.models import Book, GenreToBook, BookToCollection, SimilarBook
+
+# Number of similar books kept for every book
+SIMILAR_BOOKS_COUNT = 20
+
+# Number of books whose similarities are computed at once (bounds memory used by a block of similarities)
+BLOCK_SIZE = 256
+
+
+def ids_array(ids: List[int]) -> np.ndarray:
+    return np.array(ids, dtype=np.int64)
+
+
+async def load_features(session: AsyncSession) -> Tuple[np.ndarray, sparse.csr_matrix]:
+    # Book features are its genres and collections it belongs to. Rows are L2-normalized,
+    # so product of two rows is cosine similarity of the books
+    book_ids = ids_array((await session.execute(select(Book.id).order_by(Book.id))).scalars().all())
+    genre_links = (await session.execute(select(GenreToBook.book_id, GenreToBook.genre_id))).all()
+    collection_links = (await session.execute(select(BookToCollection.book_id, BookToCollection.collection_id))).all()
+
+    genre_books, genre_ids = ids_array([link[0] for link in genre_links]), ids_array([link[1] for link in genre_links])
+    collection_books = ids_array([link[0] for link in collection_links])
+    collection_ids = ids_array([link[1] for link in collection_links])
+
+    _, genre_columns = np.unique(genre_ids, return_inverse=True)
+    _, collection_columns = np.unique(collection_ids, return_inverse=True)
+    genres_count = genre_columns.max(initial=-1) + 1
+    features_count = genres_count + collection_columns.max(initial=-1) + 1
+
+    rows = np.searchsorted(book_ids, np.concatenate([genre_books, collection_books]))
+    columns = np.concatenate([genre_columns, collection_columns + genres_count])
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(book_ids), features_count)
+    )
+    # Repeated links are summed up on construction, but features are binary
+    matrix.data[:] = 1
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return book_ids, sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def similarities_blocks(matrix: sparse.csr_matrix, rows: np.ndarray) -> Iterator[Tuple[np.ndarray, sparse.csr_matrix]]:
+    # Cosine similarities of given rows to all rows, computed block by block
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = rows[start:start + BLOCK_SIZE]
+        yield block, matrix[block].dot(transposed).tocsr()
+
+
+def top_similar(row: int, similarities: sparse.csr_matrix, index: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Most similar rows (except the row itself) ordered by descending similarity
+    start, end = similarities.indptr[index], similarities.indptr[index + 1]
+    columns, scores = similarities.indices[start:end], similarities.data[start:end]
+    mask = (columns != row) & (scores > 0)
+    columns, scores = columns[mask], scores[mask]
+    if len(scores) > SIMILAR_BOOKS_COUNT:
+        top = np.argpartition(-scores, SIMILAR_BOOKS_COUNT)[:SIMILAR_BOOKS_COUNT]
+        columns, scores = columns[top], scores[top]
+    order = np.lexsort((columns, -scores))
+    return columns[order], scores[order]
+
+
+async def find_affected(session: AsyncSession, book_ids: np.ndarray, matrix: sparse.csr_matrix,
+                        stale_rows: np.ndarray) -> np.ndarray:
+    # Similarity of any book to a stale one may have changed, so besides stale books themselves lists of books that
+    # either had a stale book among similar ones or now get a stale book above their weakest similar one are rebuilt
+    stale_ids = [int(book_id) for book_id in book_ids[stale_rows]]
+    statement = select(SimilarBook.book_id)\
+        .where(SimilarBook.similar_book_id == any_(literal(stale_ids, ARRAY(Integer))))\
+        .distinct()
+    affected_ids = ids_array((await session.execute(statement)).scalars().all())
+
+    # Weakest kept similarity of every book (books with incomplete lists accept any similar book)
+    thresholds = np.zeros(len(book_ids), dtype=np.float32)
+    statement = select(SimilarBook.book_id, func.min(SimilarBook.score))\
+        .group_by(SimilarBook.book_id)\
+        .having(func.count() >= SIMILAR_BOOKS_COUNT)
+    for book_id, min_score in (await session.execute(statement)).all():
+        thresholds[np.searchsorted(book_ids, book_id)] = min_score
+
+    affected_rows = [np.searchsorted(book_ids, affected_ids[np.isin(affected_ids, book_ids)])]
+    for _, similarities in similarities_blocks(matrix, stale_rows):
+        affected_rows.append(similarities.indices[similarities.data > thresholds[similarities.indices]])
+    return np.unique(np.concatenate(affected_rows))
+
+
+async def store_similar(session: AsyncSession, book_ids: np.ndarray, matrix: sparse.csr_matrix, rows: np.ndarray):
+    # Replace similar books of given rows committing every block
+    for block, similarities in similarities_blocks(matrix, rows):
+        block_ids = [int(book_id) for book_id in book_ids[block]]
+        statement = delete(SimilarBook).where(SimilarBook.book_id == any_(literal(block_ids, ARRAY(Integer))))
+        await session.execute(statement)
+
+        similar_books = []
+        for index, row in enumerate(block):
+            columns, scores = top_similar(row, similarities, index)
+            similar_books.extend(
+                dict(
+                    book_id=int(book_ids[row]),
+                    similar_book_id=int(book_ids[column]),
+                    score=float(score)
+                ) for column, score in zip(columns, scores)
+            )
+        if len(similar_books) > 0:
+            await session.execute(insert(SimilarBook), similar_books)
+
+        await session.commit()
+
+
+async def refresh_similar_books(full: bool = False):
+    async with async_session_maker() as session:
+        # Take stale books (books marked again while the job runs are left for the next run)
+        statement = update(Book).values(similar_stale=False).returning(Book.id)
+        if not full:
+            statement = statement.where(Book.similar_stale)
+        stale_ids = (await session.execute(statement.execution_options(synchronize_session=False))).scalars().all()
+        await session.commit()
+        if len(stale_ids) == 0:
+            print("No stale books")
+            return
+
+        try:
+            # Features and current similar books are read from a single snapshot, so links never refer to books
+            # missing from loaded ones (transaction ends with the first stored block)
+            await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            book_ids, matrix = await load_features(session)
+
+            # Stale books deleted since they were taken are skipped
+            stale_ids_array = np.sort(ids_array(stale_ids))
+            stale_rows = np.searchsorted(book_ids, stale_ids_array[np.isin(stale_ids_array, book_ids)])
+            rows = np.arange(len(book_ids)) if full else await find_affected(session, book_ids, matrix, stale_rows)
+            rows = np.union1d(rows, stale_rows)
+            await store_similar(session, book_ids, matrix, rows)
+        except Exception:
+            # Return taken books to the next run
+            await session.rollback()
+            statement = update(Book)\
+                .where(Book.id == any_(literal(stale_ids, ARRAY(Integer))))\
+                .values(similar_stale=True)\
+                .execution_options(synchronize_session=False)
+            await session.execute(statement)
+            await session.commit()
+            raise
+
+    print(f"Recomputed similar books of {len(rows)} books ({len(stale_ids)} stale)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recompute similar books of books with changed genres or collections "
+                                                 "(run from project root as `python -m models.similar_books`)")
+    parser.add_argument("--full", action="store_true", help="recompute similar books of all books")
+    args = parser.parse_args()
+    asyncio.run(refresh_similar_books(args.full))
@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+
+from auth.database import async_session_maker
+from cache.cache import get_job_cache_instance
+from cache.trending import rebuild_trending_books
+
+
+# Timeout of a single cache call of the rebuild in seconds
+REBUILD_CACHE_CALL_TIMEOUT = 30
+
+
+async def rebuild():
+    cache = get_job_cache_instance(REBUILD_CACHE_CALL_TIMEOUT)
+    async with async_session_maker() as session:
+        sizes = await rebuild_trending_books(session, cache)
+    await cache.client.aclose()
+
+    for window, size in sizes.items():
+        print(f"Trending books ({window}): {size} books")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild trending books leaderboards from reviews "
+                                                 "(run from project root as `python -m models.trending_books`)")
+    parser.parse_args()
+    asyncio.run(rebuild())
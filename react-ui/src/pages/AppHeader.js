@@ -113,7 +113,7 @@ const AppHeader = () => {
                 })
             })
             .then(res => res.json())
-            .then(setCallback)
+            .then(page => setCallback(page.books))
         } else {
             setCallback([])
         }
@@ -19,13 +19,20 @@ const FilterSection = ({setSelectedGenres, setSelectedAuthors, setYearFrom, setY
         .then(setCallback)
     }
 
-    const fetchAuthors = (setCallback) => {
-        fetch(`${process.env.REACT_APP_WEB_APP_URI}/authors/`, {
+    const fetchAuthors = (setCallback, cursor = null, authors = []) => {
+        const query = cursor ? `?include=&limit=500&cursor=${encodeURIComponent(cursor)}` : '?include=&limit=500'
+        fetch(`${process.env.REACT_APP_WEB_APP_URI}/authors/${query}`, {
             method: 'GET',
             credentials: 'include'
         })
         .then(res => res.json())
-        .then(setCallback)
+        .then(page => {
+            if (page.next_cursor) {
+                fetchAuthors(setCallback, page.next_cursor, [...authors, ...page.authors])
+            } else {
+                setCallback([...authors, ...page.authors])
+            }
+        })
     }
 
     return (
@@ -122,7 +129,7 @@ const BookCard = ({book}) => {
     )
 }
 
-const BooksList = ({books, booksPerRow, rowsPerPage}) => {
+const BooksList = ({books, hasMore, loadMore, filters, booksPerRow, rowsPerPage}) => {
 
     const booksPerPage = rowsPerPage * booksPerRow
     const totalPages = Math.ceil(books.length / booksPerPage)
@@ -131,7 +138,14 @@ const BooksList = ({books, booksPerRow, rowsPerPage}) => {
 
     useEffect(() => {
         setCurrentPage(0)
-    }, [books])
+    }, [filters])
+
+    // Books are loaded page by page, the next page is requested once the last loaded one is shown
+    useEffect(() => {
+        if (hasMore && currentPage + 1 >= totalPages) {
+            loadMore()
+        }
+    }, [currentPage, totalPages, hasMore])
 
 
     return (
@@ -168,25 +182,36 @@ const BooksPage = () => {
         author_ids: null,
     })
 
-    const [books, setBooks] = useState([])
+    const [books, setBooks] = useState({filters: null, books: [], nextCursor: null})
 
-    const fetchBooks = (setCallback) => {
+    const fetchBooks = (setCallback, cursor = null) => {
         fetch(`${process.env.REACT_APP_WEB_APP_URI}/books/list`, {
             method: 'POST',
             credentials: 'include',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify(filters)
+            body: JSON.stringify({...filters, cursor: cursor})
         })
         .then(res => res.json())
         .then(setCallback)
     }
 
+    const loadMoreBooks = () => {
+        const requestFilters = filters
+        const cursor = books.nextCursor
+        // Page is appended only if filters have not changed and it has not been appended yet
+        fetchBooks(page => setBooks(prev => {
+            if (prev.filters !== requestFilters || prev.nextCursor !== cursor) return prev
+            return {filters: requestFilters, books: [...prev.books, ...page.books], nextCursor: page.next_cursor}
+        }), cursor)
+    }
+
 
     useEffect(() => {
+        const requestFilters = filters
         let timer = setTimeout(() => {
-            fetchBooks(setBooks)
+            fetchBooks(page => setBooks({filters: requestFilters, books: page.books, nextCursor: page.next_cursor}))
         }, 200)
         return () => {
             clearTimeout(timer)
@@ -197,7 +222,14 @@ const BooksPage = () => {
     return (
         <div className={"BooksPage"}>
             <SideBar setFilters={setFilters}/>
-            <BooksList books={books} booksPerRow={5} rowsPerPage={2}/>
+            <BooksList
+                books={books.books}
+                hasMore={books.filters === filters && books.nextCursor !== null}
+                loadMore={loadMoreBooks}
+                filters={books.filters}
+                booksPerRow={5}
+                rowsPerPage={2}
+            />
         </div>
     )
 
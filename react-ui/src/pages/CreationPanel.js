@@ -123,13 +123,20 @@ const CreateBookTemplate = ({setMessage}) => {
         .then(setCallback)
     }
 
-    const fetchAuthors = (setCallback) => {
-        fetch(`${process.env.REACT_APP_WEB_APP_URI}/authors/`, {
+    const fetchAuthors = (setCallback, cursor = null, authors = []) => {
+        const query = cursor ? `?include=&limit=500&cursor=${encodeURIComponent(cursor)}` : '?include=&limit=500'
+        fetch(`${process.env.REACT_APP_WEB_APP_URI}/authors/${query}`, {
             method: 'GET',
             credentials: 'include'
         })
         .then(res => res.json())
-        .then(setCallback)
+        .then(page => {
+            if (page.next_cursor) {
+                fetchAuthors(setCallback, page.next_cursor, [...authors, ...page.authors])
+            } else {
+                setCallback([...authors, ...page.authors])
+            }
+        })
     }
 
     const fetchCreateBook = () => {
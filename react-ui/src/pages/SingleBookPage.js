@@ -117,6 +117,19 @@ const ReviewsBlock = ({book, setUpdateTrigger, setBook}) => {
 
     const auth = useSelector(state => state.auth)
 
+    const fetchMoreReviews = () => {
+        fetch(`${process.env.REACT_APP_WEB_APP_URI}/books/${book.id}/reviews?cursor=${encodeURIComponent(book.reviews_next_cursor)}`, {
+            method: 'GET',
+            credentials: 'include'
+        })
+        .then(res => res.json())
+        .then(page => setBook(prev => ({
+            ...prev,
+            reviews: [...prev.reviews, ...page.reviews],
+            reviews_next_cursor: page.next_cursor
+        })))
+    }
+
     return (
         <div className={"ReviewsBlock"}>
             <div className={"Header"}>Отзывы</div>
@@ -124,6 +137,7 @@ const ReviewsBlock = ({book, setUpdateTrigger, setBook}) => {
                 {book.reviews
                 .sort((a, b) => Date.parse(b.created) - Date.parse(a.created))
                 .map(review => <ReviewCard review={review} setBook={setBook}/>)}
+                {book.reviews_next_cursor ? <button onClick={fetchMoreReviews}>Показать ещё</button> : null}
                 {auth.id ? <CreateReviewCard book={book} setUpdateTrigger={setUpdateTrigger}/> : null}
             </div>
         </div>
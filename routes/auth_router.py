@@ -44,10 +44,9 @@ async def auth_status(user: User = Depends(current_user),
 @reset_password_router.post("/exchange_code")
 async def exchange_code(code: str):
     cache = get_cache_instance()
-    token = cache.get(code)
+    token = await cache.getdel(code)
     if token is None:
         raise HTTPException(status_code=status.HTTP_408_REQUEST_TIMEOUT)
-    cache.delete(code)
     return {"token": token}
 
 
@@ -1,33 +1,93 @@
 import json
-from typing import List
+from collections import defaultdict
+from typing import List, Literal, Union, Set, Sequence, AsyncIterator
 
-from fastapi import APIRouter, Depends, status, HTTPException, Response
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Query, status, HTTPException, Response, Request
+from sqlalchemy import select, update, func, tuple_, or_, literal
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.database import get_async_session
-from cache.cache import get_cache_instance
-from models.models import Book, Author, User, Role, Review, Genre, GenreToBook
+from auth.database import get_async_session, async_session_maker
+from cache.cache import get_cache_instance, get_cached_document, set_cached_document, invalidate_cached_documents
+from cache.trending import remove_trending_books
+from models.models import Book, Author, User, Role, Collection, BookToCollection, SimilarBook
 from routes.auth_router import current_user
 from routes.models.authors.create_author_model import CreateAuthorRequestModel, CreateAuthorResponseModel
 from routes.models.authors.delete_author_model import DeleteAuthorResponseModel
 from routes.models.authors.get_author_model import GetAuthorResponseModel
-from routes.models.authors.get_authors_model import GetAuthorsResponseModel
+from routes.models.authors.get_authors_model import GetAuthorsResponseModel, GetAuthorsPageResponseModel
+from routes.models.authors.search_authors_model import SearchAuthorsResponseModel
 from routes.models.authors.update_author_model import UpdateAuthorRequestModel, UpdateAuthorResponseModel
+from routes.utils.books import select_books_genres
+from routes.utils.etags import make_etag, etag_matches, not_modified_response
+from routes.utils.include import parse_include, include_variant
+from routes.utils.pagination import encode_cursor, decode_cursor
+from routes.utils.streaming import accepts_ndjson, stream_partitions, ndjson_response
 
 authors_router = APIRouter()
 
+# Optional sections of author document
+AUTHOR_SECTIONS = ('stats', 'books', 'books.genres')
 
-@authors_router.get("/{author_id}")
+# Maximal number of authors returned by search
+AUTHORS_SEARCH_MAX_LIMIT = 50
+
+
+@authors_router.get("/search")
+async def search_authors(response: Response,
+                         q: str = Query(min_length=1, max_length=100),
+                         limit: int = Query(default=10, ge=1, le=AUTHORS_SEARCH_MAX_LIMIT),
+                         session: AsyncSession = Depends(get_async_session)) -> List[SearchAuthorsResponseModel]:
+
+    # Select authors having a word similar to the query or containing the query in name (both conditions
+    # are served by trigram index), the most similar first
+    query = q.strip()
+    statement = select(Author.id, Author.name)\
+        .where(or_(literal(query).op('<%')(Author.name), Author.name.icontains(query, autoescape=True)))\
+        .order_by(func.word_similarity(query, Author.name).desc(), Author.name, Author.id)\
+        .limit(limit)
+    authors = (await session.execute(statement)).all()
+
+    # Format response
+    response.status_code = status.HTTP_200_OK
+    res = [
+        SearchAuthorsResponseModel(
+            id=author_id,
+            name=name
+        ) for author_id, name in authors
+    ]
+
+    return res
+
+
+@authors_router.get("/{author_id}", response_model_exclude_unset=True)
 async def get_author(author_id: int,
+                     request: Request,
                      response: Response,
+                     include: Union[None, str] = None,
                      session: AsyncSession = Depends(get_async_session)) -> GetAuthorResponseModel:
 
-    # # Check for existing in cache
-    # cache = get_cache_instance()
-    # from_cache = cache.get(f'/authors/{author_id}')
-    # if from_cache is not None:
-    #     return GetAuthorResponseModel.parse_json(from_cache)
+    # Parse requested document sections
+    include = parse_include(include, AUTHOR_SECTIONS)
+    variant = include_variant(include, AUTHOR_SECTIONS)
+
+    # Answer with headers only if client copy of the author is up to date
+    statement = select(
+        Author.version,
+        select(func.coalesce(func.sum(Book.version), 0)).where(Book.author_id == Author.id).scalar_subquery()
+    ).where(Author.id == author_id)
+    versions = (await session.execute(statement)).one_or_none()
+    if versions is not None:
+        etag = make_etag(*versions, variant=variant)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        response.headers["ETag"] = etag
+
+    # Check for existing in cache (only full documents are cached, documents of other versions are ignored)
+    cache = get_cache_instance()
+    if variant is None and versions is not None:
+        from_cache = await get_cached_document(cache, f'/authors/{author_id}', GetAuthorResponseModel, version=etag)
+        if from_cache is not None:
+            return from_cache
 
     # Check for corresponding author existence
     author = await session.get(Author, author_id)
@@ -37,97 +97,188 @@ async def get_author(author_id: int,
             detail=f"Author with id={author_id} not found"
         )
 
-    statement = select(Book).where(Book.author_id == author.id)
-    books = (await session.execute(statement)).scalars().all()
-    books_list = []
-    for book in books:
-        # Select book reviews and collect additional data
-        statement = select(Review).where(Review.book_id == book.id)
-        reviews = (await session.execute(statement)).scalars().all()
-        reviews_count = len(reviews)
-        book_rating = (sum([review.rating for review in reviews]) / reviews_count) if reviews_count > 0 else 0
-
-        # Select book genres
-        statement = select(Genre).where(GenreToBook.book_id == book.id, Genre.id == GenreToBook.genre_id)
-        genres = (await session.execute(statement)).scalars().all()
-
-        book_model = GetAuthorResponseModel.BookModel(
-            id=book.id,
-            title=book.title,
-            genres=[
-                GetAuthorResponseModel.GenreModel(
-                    id=genre.id,
-                    name=genre.name
-                ) for genre in genres
-            ],
-            rating=book_rating,
-            reviews_count=reviews_count,
-        )
-        books_list.append(book_model)
-
     # Format response
     response.status_code = status.HTTP_200_OK
     res = GetAuthorResponseModel(
         id=author.id,
         name=author.name,
-        about=author.about,
-        books=books_list
+        about=author.about
     )
+    if 'stats' in include:
+        res.stats = GetAuthorResponseModel.StatsModel(
+            books_count=author.books_count,
+            rating=round(author.rating, 2),
+            reviews_count=author.reviews_count,
+            first_year=author.first_year,
+            last_year=author.last_year
+        )
 
-    # # Cache response
-    # cache.set(f"/authors/{author.id}", json.dumps(res.as_dict()))
-
-    return res
-
-
-@authors_router.get("/")
-async def get_authors(response: Response,
-                      session: AsyncSession = Depends(get_async_session)) -> List[GetAuthorsResponseModel]:
-
-    statement = select(Author)
-    authors = (await session.execute(statement)).scalars().all()
-    res = []
-    for author in authors:
-
-        statement = select(Book).where(Book.author_id == author.id)
+    # Select books (with genres if requested)
+    if 'books' in include:
+        statement = select(Book).where(Book.author_id == author.id).order_by(Book.id)
         books = (await session.execute(statement)).scalars().all()
-        books_list = []
+        books_genres = {}
+        if 'books.genres' in include:
+            books_genres = await select_books_genres(session, [book.id for book in books], fresh=variant is None)
+        res.books = []
         for book in books:
-            # Select book reviews and collect additional data
-            statement = select(Review).where(Review.book_id == book.id)
-            reviews = (await session.execute(statement)).scalars().all()
-            reviews_count = len(reviews)
-            book_rating = (sum([review.rating for review in reviews]) / reviews_count) if reviews_count > 0 else 0
-
-            # Select book genres
-            statement = select(Genre).where(GenreToBook.book_id == book.id, Genre.id == GenreToBook.genre_id)
-            genres = (await session.execute(statement)).scalars().all()
-
-            book_model = GetAuthorsResponseModel.BookModel(
+            book_model = GetAuthorResponseModel.BookModel(
                 id=book.id,
                 title=book.title,
-                genres=[
-                    GetAuthorsResponseModel.GenreModel(
+                rating=book.rating,
+                reviews_count=book.reviews_count,
+            )
+            if 'books.genres' in include:
+                book_model.genres = [
+                    GetAuthorResponseModel.GenreModel(
                         id=genre.id,
                         name=genre.name
-                    ) for genre in genres
-                ],
-                rating=book_rating,
-                reviews_count=reviews_count,
-            )
-            books_list.append(book_model)
+                    ) for genre in books_genres.get(book.id, [])
+                ]
+            res.books.append(book_model)
+
+    # Cache response (with version of the data it was built from)
+    if variant is None and versions is not None:
+        await set_cached_document(cache, f'/authors/{author.id}', res, dependencies=[
+            ('author', author.id),
+            *[('book', book.id) for book in res.books],
+            *[('genre', genre.id) for book in res.books for genre in book.genres]
+        ], version=etag)
+
+    return res
+
 
+async def _select_authors_models(session: AsyncSession, authors: Sequence[Author],
+                                 include: Set[str]) -> List[GetAuthorsResponseModel]:
+    # Select books of all given authors with their genres (if requested) with a single query each
+    authors_books = defaultdict(list)
+    books_genres = {}
+    if 'books' in include:
+        statement = select(Book).where(Book.author_id.in_([author.id for author in authors])).order_by(Book.id)
+        for book in (await session.execute(statement)).scalars().all():
+            authors_books[book.author_id].append(book)
+        if 'books.genres' in include:
+            books_ids = {book.id for books in authors_books.values() for book in books}
+            books_genres = await select_books_genres(session, books_ids)
+
+    authors_models = []
+    for author in authors:
         author_model = GetAuthorsResponseModel(
             id=author.id,
             name=author.name,
-            about=author.about,
-            books=books_list
+            about=author.about
+        )
+        if 'stats' in include:
+            author_model.stats = GetAuthorsResponseModel.StatsModel(
+                books_count=author.books_count,
+                rating=round(author.rating, 2),
+                reviews_count=author.reviews_count,
+                first_year=author.first_year,
+                last_year=author.last_year
+            )
+        if 'books' in include:
+            author_model.books = []
+            for book in authors_books[author.id]:
+                book_model = GetAuthorsResponseModel.BookModel(
+                    id=book.id,
+                    title=book.title,
+                    rating=book.rating,
+                    reviews_count=book.reviews_count,
+                )
+                if 'books.genres' in include:
+                    book_model.genres = [
+                        GetAuthorsResponseModel.GenreModel(
+                            id=genre.id,
+                            name=genre.name
+                        ) for genre in books_genres.get(book.id, [])
+                    ]
+                author_model.books.append(book_model)
+        authors_models.append(author_model)
+
+    return authors_models
+
+
+async def _stream_authors(statement, include: Set[str]) -> AsyncIterator[GetAuthorsResponseModel]:
+    # Stream is read after the request handler returns, so it holds its own session
+    async with async_session_maker() as session:
+        async for authors in stream_partitions(session, statement):
+            for author_model in await _select_authors_models(session, [author for author, in authors], include):
+                yield author_model
+
+
+@authors_router.get("/", response_model_exclude_unset=True)
+async def get_authors(request: Request,
+                      response: Response,
+                      include: Union[None, str] = None,
+                      sort_by: Literal['name', 'books_count', 'rating', 'reviews_count'] = 'name',
+                      min_books_count: Union[None, int] = None,
+                      min_rating: Union[None, float] = None,
+                      cursor: Union[None, str] = None,
+                      limit: int = Query(default=50, ge=1, le=500),
+                      session: AsyncSession = Depends(get_async_session)) -> GetAuthorsPageResponseModel:
+
+    # Parse requested document sections
+    include = parse_include(include, AUTHOR_SECTIONS)
+
+    # Streamed response holds all matching authors, so it can not be paged
+    if accepts_ndjson(request) and (cursor is not None or 'limit' in request.query_params):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid request payload. Cursor and limit can not be combined with streamed response"
         )
 
-        res.append(author_model)
+    # Filter authors by precomputed stats
+    statement = select(Author)
+    if min_books_count is not None:
+        statement = statement.where(Author.books_count >= min_books_count)
+    if min_rating is not None:
+        statement = statement.where(Author.rating >= min_rating)
+
+    # Sort authors by requested key (author id is used as a tie-breaker for keyset pagination)
+    sort_keys = {
+        'name': (Author.name, False, str),
+        'books_count': (Author.books_count, True, int),
+        'rating': (Author.rating, True, (int, float)),
+        'reviews_count': (Author.reviews_count, True, int),
+    }
+    sort_key, descending, key_type = sort_keys[sort_by]
+    if descending:
+        statement = statement.order_by(sort_key.desc(), Author.id.desc())
+    else:
+        statement = statement.order_by(sort_key, Author.id)
+
+    # Stream all matching authors line by line
+    if accepts_ndjson(request):
+        return ndjson_response(_stream_authors(statement, include))
+
+    # Continue from the last author of the previous page
+    if cursor is not None:
+        cursor_sort_by, last_key, last_id = decode_cursor(cursor, 3)
+        if cursor_sort_by != sort_by or not isinstance(last_key, key_type) or not isinstance(last_id, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid request payload. Cursor does not match requested sorting"
+            )
+        if descending:
+            statement = statement.where(tuple_(sort_key, Author.id) < tuple_(last_key, last_id))
+        else:
+            statement = statement.where(tuple_(sort_key, Author.id) > tuple_(last_key, last_id))
+
+    # Select one extra author to find out whether the next page exists
+    statement = statement.limit(limit + 1)
+    authors = (await session.execute(statement)).scalars().all()
+    next_cursor = None
+    if len(authors) > limit:
+        authors = authors[:limit]
+        last_author = authors[-1]
+        next_cursor = encode_cursor(sort_by, getattr(last_author, sort_key.key), last_author.id)
 
     # Format response
     response.status_code = status.HTTP_200_OK
+    res = GetAuthorsPageResponseModel(
+        authors=await _select_authors_models(session, authors, include),
+        next_cursor=next_cursor
+    )
 
     return res
 
@@ -195,28 +346,24 @@ async def update_author(author_id: int, new_author: UpdateAuthorRequestModel,
     author.name = new_author.name
     author.about = new_author.about
 
+    # Bump versions of the author and author books (books documents embed author name)
+    author.version = Author.version + 1
+    statement = update(Book).where(Book.author_id == author.id).values(version=Book.version + 1)
+    await session.execute(statement)
+
     # Committing changes
     await session.commit()
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/authors/{author.id}')
+    # Invalidate cache
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, ('author', author.id))
 
     # Collect additional data about author
-    statement = select(Book).where(Book.author_id == author.id)
+    statement = select(Book).where(Book.author_id == author.id).order_by(Book.id)
     books = (await session.execute(statement)).scalars().all()
+    books_genres = await select_books_genres(session, [book.id for book in books])
     books_list = []
     for book in books:
-        # Select book reviews and collect additional data
-        statement = select(Review).where(Review.book_id == book.id)
-        reviews = (await session.execute(statement)).scalars().all()
-        reviews_count = len(reviews)
-        book_rating = (sum([review.rating for review in reviews]) / reviews_count) if reviews_count > 0 else 0
-
-        # Select book genres
-        statement = select(Genre).where(GenreToBook.book_id == book.id, Genre.id == GenreToBook.genre_id)
-        genres = (await session.execute(statement)).scalars().all()
-
         book_model = UpdateAuthorResponseModel.BookModel(
             id=book.id,
             title=book.title,
@@ -224,10 +371,10 @@ async def update_author(author_id: int, new_author: UpdateAuthorRequestModel,
                 UpdateAuthorResponseModel.GenreModel(
                     id=genre.id,
                     name=genre.name
-                ) for genre in genres
+                ) for genre in books_genres.get(book.id, [])
             ],
-            rating=book_rating,
-            reviews_count=reviews_count,
+            rating=book.rating,
+            reviews_count=book.reviews_count,
         )
         books_list.append(book_model)
 
@@ -264,16 +411,31 @@ async def delete_author(author_id: int,
             detail=f"Author with id={author_id} can not be found"
         )
 
-    # Get name before delete
+    # Get name and books before delete (books are deleted in cascade)
     author_name = author.name
+    statement = select(Book.id).where(Book.author_id == author.id)
+    book_ids = (await session.execute(statement)).scalars().all()
+
+    # Bump versions of collections listing author books
+    statement = update(Collection)\
+        .where(Collection.id.in_(select(BookToCollection.collection_id).where(BookToCollection.book_id.in_(book_ids))))\
+        .values(version=Collection.version + 1)
+    await session.execute(statement)
+
+    # Mark books having author books among similar ones for recomputation (similar books are deleted in cascade)
+    statement = update(Book)\
+        .where(Book.id.in_(select(SimilarBook.book_id).where(SimilarBook.similar_book_id.in_(book_ids))))\
+        .values(similar_stale=True)
+    await session.execute(statement)
 
     # Committing changes
     await session.delete(author)
     await session.commit()
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/authors/{author.id}')
+    # Invalidate cache
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, ('author', author_id), *[('book', book_id) for book_id in book_ids])
+    await remove_trending_books(cache, *book_ids)
 
     # Format response
     response.status_code = status.HTTP_200_OK
@@ -1,30 +1,213 @@
 import json
-from typing import List, Union
+from typing import List, Union, Literal, AsyncIterator
 
-from fastapi import APIRouter, Depends, status, HTTPException, Response
+from fastapi import APIRouter, Depends, status, HTTPException, Response, Request, Query
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import select, update, func, tuple_, distinct, literal, literal_column, any_, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.database import get_async_session
-from cache.cache import get_cache_instance
-from models.models import Book, Author, User, Role, Review, Genre, GenreToBook
+from auth.database import get_async_session, async_session_maker
+from cache.cache import get_cache_instance, get_cached_document, get_cached_documents, set_cached_document, \
+    invalidate_cached_documents
+from cache.genres import get_genres
+from cache.trending import get_trending_scores, remove_trending_books
+from models.models import Book, Author, User, Role, Genre, GenreToBook, Collection, BookToCollection, SimilarBook, \
+    BOOKS_SEARCH_CONFIG
 from routes.auth_router import current_user
 from routes.models.books.create_book_model import CreateBookRequestModel, CreateBookResponseModel
+from routes.models.books.create_books_bulk_model import CreateBooksBulkRequestModel, CreateBooksBulkResponseModel
 from routes.models.books.delete_book_model import DeleteBookModelResponse
 
 from routes.models.books.get_book_model import GetBookResponseModel
-from routes.models.books.get_books_model import GetBooksResponseModel, GetBooksRequestModel
+from routes.models.books.get_book_reviews_model import GetBookReviewsResponseModel
+from routes.models.books.get_books_batch_model import GetBooksBatchResponseModel
+from routes.models.books.get_trending_books_model import GetTrendingBooksResponseModel
+from routes.models.books.get_books_model import GetBooksResponseModel, GetBooksRequestModel, \
+    GetBooksPageResponseModel, GetBooksFacetsModel
 from routes.models.books.update_book_model import UpdateBookRequestModel, UpdateBookResponseModel
+from routes.utils.authors import refresh_authors_stats
+from routes.utils.books import select_books_genres, insert_books
+from routes.utils.etags import make_etag, etag_matches, not_modified_response
+from routes.utils.include import parse_include, include_variant
+from routes.utils.links import update_links
+from routes.utils.pagination import encode_cursor, decode_cursor
+from routes.utils.reviews import select_book_reviews, BOOK_REVIEWS_PAGE_SIZE
+from routes.utils.streaming import accepts_ndjson, stream_partitions, ndjson_response
 
 books_router = APIRouter()
 
+# Maximum number of books requested at once by batch GET
+BOOKS_BATCH_MAX_SIZE = 500
 
-@books_router.get("/{book_id}")
+# Maximal number of values of every facet of books list (the most frequent values are returned)
+BOOKS_FACET_SIZE = 20
+
+# Optional sections of book document
+BOOK_SECTIONS = ('genres', 'reviews')
+
+
+@books_router.get("/trending")
+async def get_trending_books(response: Response,
+                             window: Literal['7d', '30d'] = '7d',
+                             limit: int = Query(default=50, ge=1, le=500),
+                             session: AsyncSession = Depends(get_async_session)) -> List[GetTrendingBooksResponseModel]:
+
+    # Select top books from leaderboard
+    cache = get_cache_instance()
+    trending = await get_trending_scores(cache, window, limit)
+
+    # Select books with authors and genres
+    book_ids = [book_id for book_id, _ in trending]
+    statement = select(Book, Author)\
+        .join(Author, Book.author_id == Author.id)\
+        .where(Book.id == any_(literal(book_ids, ARRAY(Integer))))
+    books = {book.id: (book, author) for book, author in (await session.execute(statement)).all()}
+    books_genres = await select_books_genres(session, books.keys())
+
+    # Format response (in leaderboard order, books deleted meanwhile are skipped)
+    response.status_code = status.HTTP_200_OK
+    res = []
+    for book_id, score in trending:
+        if book_id not in books:
+            continue
+        book, author = books[book_id]
+        book_model = GetTrendingBooksResponseModel(
+            id=book.id,
+            title=book.title,
+            author=GetTrendingBooksResponseModel.AuthorModel(
+                id=author.id,
+                name=author.name
+            ),
+            genres=[
+                GetTrendingBooksResponseModel.GenreModel(
+                    id=genre.id,
+                    name=genre.name
+                ) for genre in books_genres.get(book.id, [])
+            ],
+            rating=round(book.rating, 2),
+            reviews_count=book.reviews_count,
+            year=book.year,
+            score=score
+        )
+        res.append(book_model)
+
+    return res
+
+
+@books_router.get("/batch")
+async def get_books_batch(ids: str,
+                          response: Response,
+                          session: AsyncSession = Depends(get_async_session)) -> GetBooksBatchResponseModel:
+
+    # Parse comma-separated ids (repeated ids are returned once)
+    try:
+        book_ids = list(dict.fromkeys(int(book_id) for book_id in ids.split(",")))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid request payload. Ids must be comma-separated integers"
+        )
+    if len(book_ids) > BOOKS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request payload. At most {BOOKS_BATCH_MAX_SIZE} books can be requested at once"
+        )
+
+    # Select requested books with authors (versions of cached books are checked against the same rows)
+    statement = select(Book, Author)\
+        .join(Author, Book.author_id == Author.id)\
+        .where(Book.id == any_(literal(book_ids, ARRAY(Integer))))
+    books_rows = {book.id: (book, author) for book, author in (await session.execute(statement)).all()}
+
+    # Take books found in cache as is if they are of the current version
+    cache = get_cache_instance()
+    from_cache = await get_cached_documents(
+        cache, [f'/books/{book_id}' for book_id in books_rows], GetBookResponseModel,
+        versions=[make_etag(book.version) for book, _ in books_rows.values()]
+    )
+    books = {
+        book.id: GetBooksResponseModel(
+            id=book.id,
+            title=book.title,
+            author=GetBooksResponseModel.AuthorModel(
+                id=book.author.id,
+                name=book.author.name
+            ),
+            genres=[
+                GetBooksResponseModel.GenreModel(
+                    id=genre.id,
+                    name=genre.name
+                ) for genre in book.genres
+            ],
+            rating=book.rating,
+            reviews_count=book.reviews_count,
+            year=book.year
+        ) for book in from_cache if book is not None
+    }
+
+    # Format the rest of books with their genres
+    missing_ids = [book_id for book_id in books_rows if book_id not in books]
+    if len(missing_ids) > 0:
+        books_genres = await select_books_genres(session, missing_ids)
+        for book_id in missing_ids:
+            book, author = books_rows[book_id]
+            books[book.id] = GetBooksResponseModel(
+                id=book.id,
+                title=book.title,
+                author=GetBooksResponseModel.AuthorModel(
+                    id=author.id,
+                    name=author.name
+                ),
+                genres=[
+                    GetBooksResponseModel.GenreModel(
+                        id=genre.id,
+                        name=genre.name
+                    ) for genre in books_genres.get(book.id, [])
+                ],
+                rating=round(book.rating, 2),
+                reviews_count=book.reviews_count,
+                year=book.year
+            )
+
+    # Format response (in order of requested ids)
+    response.status_code = status.HTTP_200_OK
+    res = GetBooksBatchResponseModel(
+        books=[books[book_id] for book_id in book_ids if book_id in books],
+        missing_ids=[book_id for book_id in book_ids if book_id not in books]
+    )
+
+    return res
+
+
+@books_router.get("/{book_id}", response_model_exclude_unset=True)
 async def get_book(book_id: int,
+                   request: Request,
                    response: Response,
+                   include: Union[None, str] = None,
                    session: AsyncSession = Depends(get_async_session)) -> GetBookResponseModel:
 
+    # Parse requested document sections
+    include = parse_include(include, BOOK_SECTIONS)
+    variant = include_variant(include, BOOK_SECTIONS)
+
+    # Answer with headers only if client copy of the book is up to date
+    statement = select(Book.version).where(Book.id == book_id)
+    versions = (await session.execute(statement)).one_or_none()
+    if versions is not None:
+        etag = make_etag(*versions, variant=variant)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        response.headers["ETag"] = etag
+
+    # Check for existing in cache (only full documents are cached, documents of other versions are ignored)
+    cache = get_cache_instance()
+    if variant is None and versions is not None:
+        from_cache = await get_cached_document(cache, f'/books/{book_id}', GetBookResponseModel, version=etag)
+        if from_cache is not None:
+            return from_cache
+
     # Check for corresponding book existence
     book = await session.get(Book, book_id)
     if book is None:
@@ -33,28 +216,9 @@ async def get_book(book_id: int,
             detail=f"Book with id={book_id} not found"
         )
 
-    # # Check for existing in cache
-    # cache = get_cache_instance()
-    # from_cache = cache.get(f'/books/{book_id}')
-    # if from_cache is not None:
-    #     return GetBookResponseModel.parse_json(from_cache)
-
     # Select book author
     author = await session.get(Author, book.author_id)
 
-    # Select reviews with corresponding users
-    statement = select(Review, User).outerjoin(User, Review.user_id == User.id).where(Review.book_id == book.id)
-    reviews_to_users = (await session.execute(statement)).all()
-    reviews_count = len(reviews_to_users)
-    book_rating = 0
-    if reviews_count > 0:
-        reviews, users = list(zip(*reviews_to_users))
-        book_rating = round((sum([review.rating for review in reviews]) / reviews_count), 2) if reviews_count > 0 else 0
-
-    # Select genres
-    statement = select(Genre).where(GenreToBook.genre_id == Genre.id, GenreToBook.book_id == book.id)
-    genres = (await session.execute(statement)).scalars().all()
-
     # Format response
     response.status_code = status.HTTP_200_OK
     res = GetBookResponseModel(
@@ -64,82 +228,119 @@ async def get_book(book_id: int,
                 id=author.id,
                 name=author.name
             ),
-            genres=[
-                GetBookResponseModel.GenreModel(
-                    id=genre.id,
-                    name=genre.name
-                ) for genre in genres
-            ],
-            rating=book_rating,
-            reviews_count=reviews_count,
-            reviews=[
-                GetBookResponseModel.ReviewModel(
-                    id=review.id,
-                    user=GetBookResponseModel.UserModel(
-                        id=user.id,
-                        name=user.name
-                    ),
-                    rating=review.rating,
-                    text=review.text,
-                    created=review.created
-                ) for review, user in reviews_to_users
-            ],
+            rating=round(book.rating, 2),
+            reviews_count=book.reviews_count,
             year=book.year,
             annotation=book.annotation
         )
 
-    # # Cache response
-    # cache.set(f"/books/{book_id}", json.dumps(res.as_dict()))
+    # Select genres
+    genres = []
+    if 'genres' in include:
+        genres = (await select_books_genres(session, [book.id], fresh=variant is None)).get(book.id, [])
+        res.genres = [
+            GetBookResponseModel.GenreModel(
+                id=genre.id,
+                name=genre.name
+            ) for genre in genres
+        ]
+
+    # Select first page of reviews with corresponding users
+    if 'reviews' in include:
+        reviews_to_users, reviews_next_cursor = await select_book_reviews(session, book.id, BOOK_REVIEWS_PAGE_SIZE)
+        res.reviews = [
+            GetBookResponseModel.ReviewModel(
+                id=review.id,
+                user=GetBookResponseModel.UserModel(
+                    id=user.id,
+                    name=user.name
+                ),
+                rating=review.rating,
+                text=review.text,
+                created=review.created
+            ) for review, user in reviews_to_users
+        ]
+        res.reviews_next_cursor = reviews_next_cursor
+
+    # Cache response (with version of the data it was built from)
+    if variant is None and versions is not None:
+        await set_cached_document(cache, f'/books/{book_id}', res, dependencies=[
+            ('book', book.id),
+            ('author', author.id),
+            *[('genre', genre.id) for genre in genres]
+        ], version=etag)
 
     return res
 
 
-@books_router.post("/list")
-async def get_books(book_search: GetBooksRequestModel,
-                    response: Response,
-                    session: AsyncSession = Depends(get_async_session)) -> List[GetBooksResponseModel]:
+@books_router.get("/{book_id}/reviews")
+async def get_book_reviews(book_id: int,
+                           response: Response,
+                           cursor: Union[None, str] = None,
+                           limit: int = Query(default=BOOK_REVIEWS_PAGE_SIZE, ge=1, le=500),
+                           session: AsyncSession = Depends(get_async_session)) -> GetBookReviewsResponseModel:
 
-    # Select books with corresponding authors initial statement
-    statement = select(Book, Author).outerjoin(Author)\
-        .where(Book.author_id == Author.id)\
+    # Check for corresponding book existence
+    book = await session.get(Book, book_id)
+    if book is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Book with id={book_id} not found"
+        )
 
-    # Filter books by search phrase
-    if book_search.search_query is not None:
-        statement = statement.where(Book.title.ilike(f"%{book_search.search_query}%"))
+    # Select page of reviews with corresponding users
+    reviews_to_users, next_cursor = await select_book_reviews(session, book.id, limit, cursor)
 
-    # Filter books by genres
-    if book_search.genre_ids is not None:
-        statement = statement.where(GenreToBook.book_id == Book.id, GenreToBook.genre_id.in_(book_search.genre_ids))
+    # Format response
+    response.status_code = status.HTTP_200_OK
+    res = GetBookReviewsResponseModel(
+        reviews=[
+            GetBookReviewsResponseModel.ReviewModel(
+                id=review.id,
+                user=GetBookReviewsResponseModel.UserModel(
+                    id=user.id,
+                    name=user.name
+                ),
+                rating=review.rating,
+                text=review.text,
+                created=review.created
+            ) for review, user in reviews_to_users
+        ],
+        next_cursor=next_cursor
+    )
 
-    # Filter books by years
-    if book_search.year_from is not None:
-        statement = statement.where(Book.year >= book_search.year_from)
-    if book_search.year_to is not None:
-        statement = statement.where(Book.year <= book_search.year_to)
+    return res
 
-    # Filter books by authors
-    if book_search.author_ids is not None:
-        statement = statement.where(Book.author_id.in_(book_search.author_ids))
 
-    # Select books with authors
-    books_to_authors = (await session.execute(statement)).all()
+@books_router.get("/{book_id}/similar")
+async def get_similar_books(book_id: int,
+                            response: Response,
+                            limit: int = Query(default=10, ge=1, le=100),
+                            session: AsyncSession = Depends(get_async_session)) -> List[GetBooksResponseModel]:
 
-    res = []
-    for book, author in books_to_authors:
+    # Select precomputed similar books with authors (most similar first)
+    statement = select(Book, Author)\
+        .join(SimilarBook, SimilarBook.similar_book_id == Book.id)\
+        .join(Author, Book.author_id == Author.id)\
+        .where(SimilarBook.book_id == book_id)\
+        .order_by(SimilarBook.score.desc(), SimilarBook.id)\
+        .limit(limit)
+    books_rows = (await session.execute(statement)).all()
 
-        # Select book reviews and collect additional data
-        statement = select(Review).where(Review.book_id == book.id)
-        reviews = (await session.execute(statement)).scalars().all()
-        reviews_count = len(reviews)
-        book_rating = round((sum([review.rating for review in reviews]) / reviews_count), 2) if reviews_count > 0 else 0
+    # Check for corresponding book existence (only if there are no similar books)
+    if len(books_rows) == 0 and await session.get(Book, book_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Book with id={book_id} not found"
+        )
 
-        # Select book genres
-        statement = select(Genre).where(GenreToBook.book_id == book.id, Genre.id == GenreToBook.genre_id)
-        genres = (await session.execute(statement)).scalars().all()
+    # Select genres of all selected books
+    books_genres = await select_books_genres(session, {book.id for book, _ in books_rows})
 
-        # Format response
-        response.status_code = status.HTTP_200_OK
-        book_model = GetBooksResponseModel(
+    # Format response
+    response.status_code = status.HTTP_200_OK
+    res = [
+        GetBooksResponseModel(
             id=book.id,
             title=book.title,
             author=GetBooksResponseModel.AuthorModel(
@@ -150,14 +351,230 @@ async def get_books(book_search: GetBooksRequestModel,
                 GetBooksResponseModel.GenreModel(
                     id=genre.id,
                     name=genre.name
-                ) for genre in genres
+                ) for genre in books_genres.get(book.id, [])
             ],
-            rating=book_rating,
-            reviews_count=reviews_count,
+            rating=round(book.rating, 2),
+            reviews_count=book.reviews_count,
             year=book.year
+        ) for book, author in books_rows
+    ]
+
+    return res
+
+
+async def _stream_books(statement) -> AsyncIterator[GetBooksResponseModel]:
+    # Stream is read after the request handler returns, so it holds its own session
+    async with async_session_maker() as session:
+        async for books_rows in stream_partitions(session, statement):
+            # Select genres of the books batch
+            books_genres = await select_books_genres(session, {book.id for book, _, _ in books_rows})
+            for book, author, _ in books_rows:
+                yield GetBooksResponseModel(
+                    id=book.id,
+                    title=book.title,
+                    author=GetBooksResponseModel.AuthorModel(
+                        id=author.id,
+                        name=author.name
+                    ),
+                    genres=[
+                        GetBooksResponseModel.GenreModel(
+                            id=genre.id,
+                            name=genre.name
+                        ) for genre in books_genres.get(book.id, [])
+                    ],
+                    rating=round(book.rating, 2),
+                    reviews_count=book.reviews_count,
+                    year=book.year
+                )
+
+
+@books_router.post("/list")
+async def get_books(book_search: GetBooksRequestModel,
+                    request: Request,
+                    response: Response,
+                    session: AsyncSession = Depends(get_async_session)) -> GetBooksPageResponseModel:
+
+    # Streamed response holds all matching books, so it can not be paged or faceted
+    if accepts_ndjson(request) and len({'cursor', 'limit', 'facets'} & book_search.model_fields_set) > 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid request payload. Cursor, limit and facets can not be combined with streamed response"
         )
 
-        res.append(book_model)
+    # Select books with corresponding authors initial statement
+    statement = select(Book, Author).join(Author, Book.author_id == Author.id)
+
+    # Filter books by search phrase (full-text mode matches both titles and annotations)
+    search_rank = None
+    if book_search.search_query is not None:
+        if book_search.search_mode == 'fulltext':
+            search_query = func.websearch_to_tsquery(BOOKS_SEARCH_CONFIG, book_search.search_query)
+            search_rank = func.ts_rank_cd(Book.search_vector, search_query)
+            statement = statement.where(Book.search_vector.bool_op("@@")(search_query))
+        else:
+            statement = statement.where(Book.title.ilike(f"%{book_search.search_query}%"))
+
+    # Filter books by genres (semi-join, so books matching several genres are not duplicated)
+    if book_search.genre_ids is not None:
+        if book_search.genre_match == 'all':
+            genre_ids = set(book_search.genre_ids)
+            statement = statement.where(Book.id.in_(
+                select(GenreToBook.book_id)
+                .where(GenreToBook.genre_id.in_(genre_ids))
+                .group_by(GenreToBook.book_id)
+                .having(func.count(distinct(GenreToBook.genre_id)) == len(genre_ids))
+            ))
+        else:
+            statement = statement.where(
+                select(GenreToBook.id)
+                .where(GenreToBook.book_id == Book.id, GenreToBook.genre_id.in_(book_search.genre_ids))
+                .exists()
+            )
+
+    # Filter books by years
+    if book_search.year_from is not None:
+        statement = statement.where(Book.year >= book_search.year_from)
+    if book_search.year_to is not None:
+        statement = statement.where(Book.year <= book_search.year_to)
+
+    # Filter books by authors
+    if book_search.author_ids is not None:
+        statement = statement.where(Book.author_id.in_(book_search.author_ids))
+
+    # Count books of the whole filtered set per genre, author and years bucket in a single pass
+    facets = None
+    if book_search.facets:
+        filtered_books = statement.with_only_columns(Book.id, Book.author_id, Book.year).subquery()
+        bucket_size = literal_column(str(book_search.year_bucket_size), Integer)
+        year_bucket = (filtered_books.c.year // bucket_size) * bucket_size
+        books_count = func.count(distinct(filtered_books.c.id))
+        facets_values = select(
+            func.grouping(GenreToBook.genre_id).label("genre_grouped"), GenreToBook.genre_id, Genre.name,
+            func.grouping(Author.id).label("author_grouped"), Author.id, Author.name,
+            func.grouping(year_bucket).label("year_grouped"), year_bucket.label("year_from"),
+            books_count.label("books_count"),
+            # Rank of the value within its facet (the most frequent values first)
+            func.row_number().over(
+                partition_by=(
+                    func.grouping(GenreToBook.genre_id), func.grouping(Author.id), func.grouping(year_bucket)
+                ),
+                order_by=(books_count.desc(), GenreToBook.genre_id, Author.id, year_bucket)
+            ).label("rank")
+        ).select_from(filtered_books)\
+            .join(Author, Author.id == filtered_books.c.author_id)\
+            .outerjoin(GenreToBook, GenreToBook.book_id == filtered_books.c.id)\
+            .outerjoin(Genre, Genre.id == GenreToBook.genre_id)\
+            .group_by(func.grouping_sets(
+                tuple_(GenreToBook.genre_id, Genre.name),
+                tuple_(Author.id, Author.name),
+                tuple_(year_bucket)
+            ))\
+            .subquery()
+        facets_statement = select(*[column for column in facets_values.c if column.key != "rank"])\
+            .where(facets_values.c.rank <= BOOKS_FACET_SIZE)\
+            .order_by(facets_values.c.books_count.desc(), facets_values.c.rank)
+        facets = GetBooksFacetsModel(genres=[], authors=[], years=[])
+        for row in (await session.execute(facets_statement)).all():
+            genre_grouped, genre_id, genre_name, author_grouped, author_id, author_name, \
+                year_grouped, year_from, books_count = row
+            if not genre_grouped and genre_id is not None:
+                facets.genres.append(GetBooksFacetsModel.GenreFacetModel(
+                    id=genre_id,
+                    name=genre_name,
+                    count=books_count
+                ))
+            elif not author_grouped:
+                facets.authors.append(GetBooksFacetsModel.AuthorFacetModel(
+                    id=author_id,
+                    name=author_name,
+                    count=books_count
+                ))
+            elif not year_grouped:
+                facets.years.append(GetBooksFacetsModel.YearFacetModel(
+                    year_from=year_from,
+                    year_to=year_from + book_search.year_bucket_size - 1,
+                    count=books_count
+                ))
+
+    # Sort books by requested key (book id is used as a tie-breaker for keyset pagination)
+    sort_by = book_search.sort_by
+    if sort_by is None:
+        sort_by = 'relevance' if search_rank is not None else 'title'
+    if sort_by == 'relevance' and search_rank is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid request payload. Sorting by relevance requires full-text search query"
+        )
+    sort_keys = {
+        'title': (Book.title, False, str),
+        'year': (Book.year, True, int),
+        'rating': (Book.rating, True, (int, float)),
+        'reviews_count': (Book.reviews_count, True, int),
+        'relevance': (search_rank, True, (int, float)),
+    }
+    sort_key, descending, key_type = sort_keys[sort_by]
+    statement = statement.add_columns(sort_key)
+    if descending:
+        statement = statement.order_by(sort_key.desc(), Book.id.desc())
+    else:
+        statement = statement.order_by(sort_key, Book.id)
+
+    # Stream all matching books line by line
+    if accepts_ndjson(request):
+        return ndjson_response(_stream_books(statement))
+
+    # Continue from the last book of the previous page
+    if book_search.cursor is not None:
+        cursor_sort_by, last_key, last_id = decode_cursor(book_search.cursor, 3)
+        if cursor_sort_by != sort_by or not isinstance(last_key, key_type) or not isinstance(last_id, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid request payload. Cursor does not match requested sorting"
+            )
+        if descending:
+            statement = statement.where(tuple_(sort_key, Book.id) < tuple_(last_key, last_id))
+        else:
+            statement = statement.where(tuple_(sort_key, Book.id) > tuple_(last_key, last_id))
+
+    # Select one extra book to find out whether the next page exists
+    statement = statement.limit(book_search.limit + 1)
+
+    # Select books with authors
+    books_rows = (await session.execute(statement)).all()
+    next_cursor = None
+    if len(books_rows) > book_search.limit:
+        books_rows = books_rows[:book_search.limit]
+        last_book, _, last_key = books_rows[-1]
+        next_cursor = encode_cursor(sort_by, last_key, last_book.id)
+
+    # Select genres of all selected books
+    books_genres = await select_books_genres(session, {book.id for book, _, _ in books_rows})
+
+    # Format response
+    response.status_code = status.HTTP_200_OK
+    res = GetBooksPageResponseModel(
+        books=[
+            GetBooksResponseModel(
+                id=book.id,
+                title=book.title,
+                author=GetBooksResponseModel.AuthorModel(
+                    id=author.id,
+                    name=author.name
+                ),
+                genres=[
+                    GetBooksResponseModel.GenreModel(
+                        id=genre.id,
+                        name=genre.name
+                    ) for genre in books_genres.get(book.id, [])
+                ],
+                rating=round(book.rating, 2),
+                reviews_count=book.reviews_count,
+                year=book.year
+            ) for book, author, _ in books_rows
+        ],
+        next_cursor=next_cursor,
+        facets=facets
+    )
 
     return res
 
@@ -185,15 +602,14 @@ async def create_book(new_book: CreateBookRequestModel,
         )
 
     # Check for corresponding genres existence
-    statement = select(Genre).where(Genre.id.in_(new_book.genre_ids))
-    genres = (await session.execute(statement)).scalars().all()
-    found_ids = [genre.id for genre in genres]
-    missing_genres = [str(genre_id) for genre_id in new_book.genre_ids if genre_id not in found_ids]
+    genres = await get_genres(session, new_book.genre_ids, fresh=True)
+    missing_genres = [str(genre_id) for genre_id in new_book.genre_ids if genre_id not in genres]
     if len(missing_genres) > 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid request payload. Genres with id={', '.join(missing_genres)} do not exist"
         )
+    genres = [genres[genre_id] for genre_id in dict.fromkeys(new_book.genre_ids)]
 
     # Book creation
     book = Book(
@@ -203,18 +619,36 @@ async def create_book(new_book: CreateBookRequestModel,
         annotation=new_book.annotation
     )
     session.add(book)
-    await session.commit()
+
+    # Flush book to get its id without committing
+    await session.flush()
+
+    # Bump author version and refresh author stats (author documents list author books)
+    statement = update(Author).where(Author.id == author.id).values(version=Author.version + 1)
+    await session.execute(statement)
+    await refresh_authors_stats(session, [author.id])
 
     # Creating corresponding books-genres records
-    for genre_id in new_book.genre_ids:
-        genre_to_book = GenreToBook(
+    session.add_all([
+        GenreToBook(
             genre_id=genre_id,
             book_id=book.id
+        ) for genre_id in new_book.genre_ids
+    ])
+
+    # Committing changes (genre could be deleted concurrently after the check)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid request payload. Some of the genres were deleted concurrently"
         )
-        session.add(genre_to_book)
 
-    # Committing changes
-    await session.commit()
+    # Invalidate cache (author documents list author books)
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, ('author', author.id))
 
     # Format response
     response.status_code = status.HTTP_200_OK
@@ -240,6 +674,47 @@ async def create_book(new_book: CreateBookRequestModel,
     return res
 
 
+@books_router.post("/bulk")
+async def create_books_bulk(new_books: CreateBooksBulkRequestModel,
+                            response: Response,
+                            user: User = Depends(current_user),
+                            session: AsyncSession = Depends(get_async_session)) -> CreateBooksBulkResponseModel:
+
+    # Check for permissions (must be Admin to create books)
+    user_role = await session.get(Role, user.role_id)
+    if user_role.role != Role.EnumRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to modify data"
+        )
+
+    # Books creation (invalid books are skipped and reported)
+    created_ids, errors = await insert_books(session, new_books.books, new_books.batch_size)
+
+    # Invalidate cache (author documents list author books)
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, *[('author', new_books.books[index].author_id) for index in created_ids])
+
+    # Format response
+    response.status_code = status.HTTP_200_OK
+    res = CreateBooksBulkResponseModel(
+        created=[
+            CreateBooksBulkResponseModel.CreatedModel(
+                index=index,
+                id=book_id
+            ) for index, book_id in sorted(created_ids.items())
+        ],
+        errors=[
+            CreateBooksBulkResponseModel.ErrorModel(
+                index=index,
+                detail=detail
+            ) for index, detail in sorted(errors.items())
+        ]
+    )
+
+    return res
+
+
 @books_router.put("/{book_id}")
 async def update_book(book_id: int, new_book: UpdateBookRequestModel,
                       response: Response,
@@ -271,51 +746,63 @@ async def update_book(book_id: int, new_book: UpdateBookRequestModel,
         )
 
     # Check for corresponding genres existence
-    statement = select(Genre).where(Genre.id.in_(new_book.genre_ids))
-    genres = (await session.execute(statement)).scalars().all()
-    found_ids = [genre.id for genre in genres]
-    missing_genres = [str(genre_id) for genre_id in new_book.genre_ids if genre_id not in found_ids]
+    genres = await get_genres(session, new_book.genre_ids, fresh=True)
+    missing_genres = [str(genre_id) for genre_id in new_book.genre_ids if genre_id not in genres]
     if len(missing_genres) > 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid request payload. Genres with id={', '.join(missing_genres)} do not exist"
         )
+    genres = [genres[genre_id] for genre_id in dict.fromkeys(new_book.genre_ids)]
 
     # Updating simple fields
     book.title = new_book.title
     book.year = new_book.year
     book.annotation = new_book.annotation
 
+    # Bump versions of the book and of its previous and new authors
+    book.version = Book.version + 1
+    statement = update(Author)\
+        .where(Author.id.in_({book.author_id, new_book.author_id}))\
+        .values(version=Author.version + 1)
+    await session.execute(statement)
+
     # Updating one-to-many relationships (book-authors)
+    previous_author_id = book.author_id
     book.author_id = new_book.author_id
+    await session.flush()
 
-    # Updating many-to-many relationships (books-genres)
-    statement = select(GenreToBook).where(GenreToBook.book_id == book.id)
-    genres_to_book = (await session.execute(statement)).scalars().all()
-    for genre_to_book in genres_to_book:
-        await session.delete(genre_to_book)
-    for genre_id in new_book.genre_ids:
-        genre_to_book = GenreToBook(
-            genre_id=genre_id,
-            book_id=book.id
+    # Refresh stats of previous and new authors (book year or author may have changed)
+    await refresh_authors_stats(session, {previous_author_id, book.author_id})
+
+    # Updating many-to-many relationships (books-genres) and committing changes
+    # (genre could be deleted concurrently after the check)
+    try:
+        changed_ids = await update_links(
+            session, GenreToBook.book_id, GenreToBook.genre_id, book.id, new_book.genre_ids
         )
-        session.add(genre_to_book)
 
-    # Committing changes
-    await session.commit()
+        # Mark similar books for recomputation
+        if len(changed_ids) > 0:
+            book.similar_stale = True
+
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid request payload. Some of the genres were deleted concurrently"
+        )
+
+    # Reload generated columns expired by update
+    await session.refresh(book, ["rating"])
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/books/{book_id}')
+    # Invalidate cache (previous author documents depend on the book itself)
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, ('book', book.id), ('author', author.id))
 
     # Collect additional data about book
-    statement = select(Review, User).outerjoin(User, Review.user_id == User.id).where(Review.book_id == book.id)
-    reviews_to_users = (await session.execute(statement)).all()
-    reviews_count = len(reviews_to_users)
-    book_rating = 0
-    if reviews_count > 0:
-        reviews, users = list(zip(*reviews_to_users))
-        book_rating = (sum([review.rating for review in reviews]) / reviews_count) if reviews_count > 0 else 0
+    reviews_to_users, reviews_next_cursor = await select_book_reviews(session, book.id, BOOK_REVIEWS_PAGE_SIZE)
 
     # Format response
     response.status_code = status.HTTP_200_OK
@@ -332,8 +819,8 @@ async def update_book(book_id: int, new_book: UpdateBookRequestModel,
                 name=genre.name
             ) for genre in genres
         ],
-        rating=book_rating,
-        reviews_count=reviews_count,
+        rating=book.rating,
+        reviews_count=book.reviews_count,
         reviews=[
             UpdateBookResponseModel.ReviewModel(
                 id=review.id,
@@ -346,6 +833,7 @@ async def update_book(book_id: int, new_book: UpdateBookRequestModel,
                 created=review.created
             ) for review, user in reviews_to_users
         ],
+        reviews_next_cursor=reviews_next_cursor,
         year=book.year,
         annotation=book.annotation
     )
@@ -367,8 +855,9 @@ async def delete_book(book_id: int,
             detail="Not enough permissions to modify data"
         )
 
-    # Check for corresponding book existence
-    book = await session.get(Book, book_id)
+    # Check for corresponding book existence (the book row is locked before the author one, as reviews lock them,
+    # and memberships can not be added to the book until it is deleted)
+    book = await session.get(Book, book_id, with_for_update=True)
     if book is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -378,13 +867,38 @@ async def delete_book(book_id: int,
     # Get name before delete
     book_title = book.title
 
-    # Committing changes
+    # Collect collections listing the book and books having it among similar ones (links are deleted in cascade)
+    statement = select(BookToCollection.collection_id).where(BookToCollection.book_id == book.id)
+    collection_ids = (await session.execute(statement)).scalars().all()
+    statement = select(SimilarBook.book_id).where(SimilarBook.similar_book_id == book.id)
+    similar_ids = (await session.execute(statement)).scalars().all()
+
+    # Delete book before the author and collections are updated
     await session.delete(book)
+    await session.flush()
+
+    # Mark books having the book among similar ones for recomputation
+    statement = update(Book)\
+        .where(Book.id.in_(similar_ids))\
+        .values(similar_stale=True)
+    await session.execute(statement)
+
+    # Bump versions of the author and collections listing the book and refresh author stats
+    statement = update(Author).where(Author.id == book.author_id).values(version=Author.version + 1)
+    await session.execute(statement)
+    statement = update(Collection)\
+        .where(Collection.id.in_(collection_ids))\
+        .values(version=Collection.version + 1)
+    await session.execute(statement)
+    await refresh_authors_stats(session, [book.author_id])
+
+    # Committing changes
     await session.commit()
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/books/{book_id}')
+    # Invalidate cache
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, ('book', book_id))
+    await remove_trending_books(cache, book_id)
 
     # Format response
     response.status_code = status.HTTP_200_OK
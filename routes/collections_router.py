@@ -1,36 +1,72 @@
 import json
-from typing import List
+from collections import defaultdict
+from typing import List, Union
 
-from fastapi import APIRouter, Depends, status, HTTPException, Response
+from fastapi import APIRouter, Depends, Query, status, HTTPException, Response, Request
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import select, update, func, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.database import get_async_session
-from cache.cache import get_cache_instance
-from models.models import Book, User, Role, Collection, BookToCollection, Review, Genre, GenreToBook
+from cache.cache import get_cache_instance, get_cached_document, set_cached_document, invalidate_cached_documents
+from models.models import Book, User, Role, Collection, BookToCollection
 from routes.auth_router import current_user
 from routes.models.collections.create_collection_model import CreateCollectionRequestModel, \
     CreateCollectionResponseModel
 from routes.models.collections.delete_collection_model import DeleteCollectionResponseModel
 from routes.models.collections.get_collection_model import GetCollectionResponseModel
-from routes.models.collections.get_collections_model import GetCollectionsResponseModel
+from routes.models.collections.get_collections_model import GetCollectionsResponseModel, \
+    GetCollectionsSummaryResponseModel
 from routes.models.collections.update_collection_model import UpdateCollectionRequestModel, \
     UpdateCollectionResponseModel
+from routes.utils.books import select_books_genres
+from routes.utils.etags import make_etag, etag_matches, not_modified_response
+from routes.utils.include import parse_include, include_variant
+from routes.utils.links import update_links
 
 collections_router = APIRouter()
 
+# Optional sections of collection document
+COLLECTION_SECTIONS = ('books', 'books.genres')
 
-@collections_router.get("/{collection_id}")
+# Default number of first books listed for every collection in summary mode
+COLLECTION_PREVIEW_SIZE = 4
+
+
+@collections_router.get("/{collection_id}", response_model_exclude_unset=True)
 async def get_collection(collection_id: int,
+                         request: Request,
                          response: Response,
+                         include: Union[None, str] = None,
                          session: AsyncSession = Depends(get_async_session)) -> GetCollectionResponseModel:
 
-    # # Check for existing in cache
-    # cache = get_cache_instance()
-    # from_cache = cache.get(f'/collections/{collection_id}')
-    # if from_cache is not None:
-    #     return GetCollectionResponseModel.parse_json(from_cache)
+    # Parse requested document sections
+    include = parse_include(include, COLLECTION_SECTIONS)
+    variant = include_variant(include, COLLECTION_SECTIONS)
+
+    # Answer with headers only if client copy of the collection is up to date
+    statement = select(
+        Collection.version,
+        select(func.coalesce(func.sum(Book.version), 0))
+        .where(BookToCollection.collection_id == Collection.id, Book.id == BookToCollection.book_id)
+        .scalar_subquery()
+    ).where(Collection.id == collection_id)
+    versions = (await session.execute(statement)).one_or_none()
+    if versions is not None:
+        etag = make_etag(*versions, variant=variant)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        response.headers["ETag"] = etag
+
+    # Check for existing in cache (only full documents are cached, documents of other versions are ignored)
+    cache = get_cache_instance()
+    if variant is None and versions is not None:
+        from_cache = await get_cached_document(
+            cache, f'/collections/{collection_id}', GetCollectionResponseModel, version=etag
+        )
+        if from_cache is not None:
+            return from_cache
 
     collection = await session.get(Collection, collection_id)
     if collection is None:
@@ -39,98 +75,145 @@ async def get_collection(collection_id: int,
             detail=f"Collection with id={collection_id} not found"
         )
 
-    statement = select(Book).where(BookToCollection.book_id == Book.id, BookToCollection.collection_id == collection_id)
-    books = (await session.execute(statement)).scalars().all()
-    books_list = []
-    for book in books:
-        # Select book reviews and collect additional data
-        statement = select(Review).where(Review.book_id == book.id)
-        reviews = (await session.execute(statement)).scalars().all()
-        reviews_count = len(reviews)
-        book_rating = (sum([review.rating for review in reviews]) / reviews_count) if reviews_count > 0 else 0
-
-        # Select book genres
-        statement = select(Genre).where(GenreToBook.book_id == book.id, Genre.id == GenreToBook.genre_id)
-        genres = (await session.execute(statement)).scalars().all()
-
-        book_model = GetCollectionResponseModel.BookModel(
-            id=book.id,
-            title=book.title,
-            genres=[
-                GetCollectionResponseModel.GenreModel(
-                    id=genre.id,
-                    name=genre.name
-                ) for genre in genres
-            ],
-            rating=book_rating,
-            reviews_count=reviews_count,
-        )
-        books_list.append(book_model)
-
     # Format response
     response.status_code = status.HTTP_200_OK
     res = GetCollectionResponseModel(
         id=collection.id,
-        title=collection.title,
-        books=books_list
+        title=collection.title
     )
-    #
-    # # Cache response
-    # cache.set(f"/collections/{collection.id}", json.dumps(res.as_dict()))
-
-    return res
-
-
-@collections_router.get("/")
-async def get_collections(response: Response,
-                          user: User = Depends(current_user),
-                          session: AsyncSession = Depends(get_async_session)) -> List[GetCollectionsResponseModel]:
 
-    statement = select(Collection).where(Collection.user_id == user.id)
-    collections = (await session.execute(statement)).scalars().all()
-    res = []
-
-    for collection in collections:
-
-        statement = select(Book).where(BookToCollection.collection_id == collection.id, Book.id == BookToCollection.book_id)
+    # Select books (with genres if requested)
+    if 'books' in include:
+        statement = select(Book)\
+            .where(BookToCollection.book_id == Book.id, BookToCollection.collection_id == collection_id)\
+            .order_by(BookToCollection.id)
         books = (await session.execute(statement)).scalars().all()
-        books_list = []
-
+        books_genres = {}
+        if 'books.genres' in include:
+            books_genres = await select_books_genres(session, [book.id for book in books], fresh=variant is None)
+        res.books = []
         for book in books:
-            # Select book reviews and collect additional data
-            statement = select(Review).where(Review.book_id == book.id)
-            reviews = (await session.execute(statement)).scalars().all()
-            reviews_count = len(reviews)
-            book_rating = (sum([review.rating for review in reviews]) / reviews_count) if reviews_count > 0 else 0
-
-            # Select book genres
-            statement = select(Genre).where(GenreToBook.book_id == book.id, Genre.id == GenreToBook.genre_id)
-            genres = (await session.execute(statement)).scalars().all()
-
-            book_model = GetCollectionsResponseModel.BookModel(
+            book_model = GetCollectionResponseModel.BookModel(
                 id=book.id,
                 title=book.title,
-                genres=[
-                    GetCollectionsResponseModel.GenreModel(
+                rating=book.rating,
+                reviews_count=book.reviews_count,
+            )
+            if 'books.genres' in include:
+                book_model.genres = [
+                    GetCollectionResponseModel.GenreModel(
                         id=genre.id,
                         name=genre.name
-                    ) for genre in genres
-                ],
-                rating=book_rating,
-                reviews_count=reviews_count,
-            )
-            books_list.append(book_model)
+                    ) for genre in books_genres.get(book.id, [])
+                ]
+            res.books.append(book_model)
+
+    # Cache response (with version of the data it was built from)
+    if variant is None and versions is not None:
+        await set_cached_document(cache, f'/collections/{collection.id}', res, dependencies=[
+            ('collection', collection.id),
+            *[('book', book.id) for book in res.books],
+            *[('genre', genre.id) for book in res.books for genre in book.genres]
+        ], version=etag)
+
+    return res
 
-        collection_model = GetCollectionsResponseModel(
-            id=collection.id,
-            title=collection.title,
-            books=books_list
-        )
 
-        res.append(collection_model)
+@collections_router.get("/")
+async def get_collections(response: Response,
+                          summary: bool = False,
+                          preview_size: int = Query(default=COLLECTION_PREVIEW_SIZE, ge=0, le=20),
+                          user: User = Depends(current_user),
+                          session: AsyncSession = Depends(get_async_session)) \
+        -> Union[List[GetCollectionsSummaryResponseModel], List[GetCollectionsResponseModel]]:
+
+    statement = select(Collection).where(Collection.user_id == user.id).order_by(Collection.id)
+    collections = (await session.execute(statement)).scalars().all()
+    collections_ids = [collection.id for collection in collections]
+
+    # Summary mode: books count and first books of every collection with a single query
+    if summary:
+        # Positions and counts are computed over memberships alone, books are joined to preview rows only
+        position = func.row_number().over(partition_by=BookToCollection.collection_id, order_by=BookToCollection.id)
+        books_count = func.count().over(partition_by=BookToCollection.collection_id)
+        memberships = select(
+            BookToCollection.collection_id,
+            BookToCollection.book_id,
+            position.label("position"),
+            books_count.label("books_count")
+        )\
+            .where(BookToCollection.collection_id == any_(literal(collections_ids, ARRAY(Integer))))\
+            .subquery()
+        # At least the first row of every collection is read to get its books count
+        statement = select(
+            memberships.c.collection_id,
+            Book.id,
+            Book.title,
+            memberships.c.position,
+            memberships.c.books_count
+        )\
+            .outerjoin(Book, (Book.id == memberships.c.book_id) & (memberships.c.position <= preview_size))\
+            .where(memberships.c.position <= max(preview_size, 1))\
+            .order_by(memberships.c.collection_id, memberships.c.position)
+        collections_counts = {}
+        collections_previews = defaultdict(list)
+        for collection_id, book_id, title, position, count in (await session.execute(statement)).all():
+            collections_counts[collection_id] = count
+            if position <= preview_size:
+                collections_previews[collection_id].append(
+                    GetCollectionsSummaryResponseModel.BookModel(
+                        id=book_id,
+                        title=title
+                    )
+                )
+
+        # Format response
+        response.status_code = status.HTTP_200_OK
+        res = [
+            GetCollectionsSummaryResponseModel(
+                id=collection.id,
+                title=collection.title,
+                books_count=collections_counts.get(collection.id, 0),
+                books=collections_previews[collection.id]
+            ) for collection in collections
+        ]
+
+        return res
+
+    # Select books of all collections with a single query (book stats are stored with books) and their genres
+    statement = select(BookToCollection.collection_id, Book)\
+        .join(Book, Book.id == BookToCollection.book_id)\
+        .where(BookToCollection.collection_id == any_(literal(collections_ids, ARRAY(Integer))))\
+        .order_by(BookToCollection.collection_id, BookToCollection.id)
+    collections_books = defaultdict(list)
+    for collection_id, book in (await session.execute(statement)).all():
+        collections_books[collection_id].append(book)
+    books_genres = await select_books_genres(
+        session, {book.id for books in collections_books.values() for book in books}
+    )
 
     # Format response
     response.status_code = status.HTTP_200_OK
+    res = [
+        GetCollectionsResponseModel(
+            id=collection.id,
+            title=collection.title,
+            books=[
+                GetCollectionsResponseModel.BookModel(
+                    id=book.id,
+                    title=book.title,
+                    genres=[
+                        GetCollectionsResponseModel.GenreModel(
+                            id=genre.id,
+                            name=genre.name
+                        ) for genre in books_genres.get(book.id, [])
+                    ],
+                    rating=book.rating,
+                    reviews_count=book.reviews_count,
+                ) for book in collections_books[collection.id]
+            ]
+        ) for collection in collections
+    ]
 
     return res
 
@@ -197,41 +280,32 @@ async def update_collection(collection_id: int,
 
     # Updating simple fields
     collection.title = new_collection.title
+    collection.version = Collection.version + 1
 
-    # Updating many-to-many relationships (books-genres)
-    statement = select(BookToCollection).where(BookToCollection.collection_id == collection.id)
-    books_to_collections = (await session.execute(statement)).scalars().all()
-    for book_to_collection in books_to_collections:
-        await session.delete(book_to_collection)
-    for book_id in new_collection.book_ids:
-        book_to_collection = BookToCollection(
-            collection_id=collection.id,
-            book_id=book_id
-        )
-        session.add(book_to_collection)
+    # Updating many-to-many relationships (books-collections)
+    changed_ids = await update_links(session, BookToCollection.collection_id, BookToCollection.book_id,
+                                     collection.id, new_collection.book_ids)
+
+    # Mark similar books of added and removed books for recomputation
+    if len(changed_ids) > 0:
+        statement = update(Book).where(Book.id.in_(changed_ids)).values(similar_stale=True)
+        await session.execute(statement)
 
     # Committing changes
     await session.commit()
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/collections/{collection_id}')
+    # Invalidate cache
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, ('collection', collection.id))
 
     # Collect additional data about collection books
-    statement = select(Book).where(BookToCollection.book_id == Book.id, BookToCollection.collection_id == collection.id)
+    statement = select(Book)\
+        .where(BookToCollection.book_id == Book.id, BookToCollection.collection_id == collection.id)\
+        .order_by(BookToCollection.id)
     books = (await session.execute(statement)).scalars().all()
+    books_genres = await select_books_genres(session, [book.id for book in books])
     books_list = []
     for book in books:
-        # Select book reviews and collect additional data
-        statement = select(Review).where(Review.book_id == book.id)
-        reviews = (await session.execute(statement)).scalars().all()
-        reviews_count = len(reviews)
-        book_rating = (sum([review.rating for review in reviews]) / reviews_count) if reviews_count > 0 else 0
-
-        # Select book genres
-        statement = select(Genre).where(GenreToBook.book_id == book.id, Genre.id == GenreToBook.genre_id)
-        genres = (await session.execute(statement)).scalars().all()
-
         book_model = UpdateCollectionResponseModel.BookModel(
             id=book.id,
             title=book.title,
@@ -239,10 +313,10 @@ async def update_collection(collection_id: int,
                 UpdateCollectionResponseModel.GenreModel(
                     id=genre.id,
                     name=genre.name
-                ) for genre in genres
+                ) for genre in books_genres.get(book.id, [])
             ],
-            rating=book_rating,
-            reviews_count=reviews_count,
+            rating=book.rating,
+            reviews_count=book.reviews_count,
         )
         books_list.append(book_model)
 
@@ -280,13 +354,19 @@ async def delete_collection(collection_id: int,
     # Get title before delete
     collection_title = collection.title
 
+    # Mark similar books of collection books for recomputation (books links are deleted in cascade)
+    statement = update(Book)\
+        .where(Book.id.in_(select(BookToCollection.book_id).where(BookToCollection.collection_id == collection.id)))\
+        .values(similar_stale=True)
+    await session.execute(statement)
+
     # Committing changes
     await session.delete(collection)
     await session.commit()
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/collections/{collection.id}')
+    # Invalidate cache
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, ('collection', collection_id))
 
     # Format response
     response.status_code = status.HTTP_200_OK
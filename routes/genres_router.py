@@ -1,33 +1,53 @@
 import json
-from typing import List
+from typing import List, Union
 
-from fastapi import APIRouter, Depends, status, HTTPException, Response
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Query, status, HTTPException, Response, Request
+from sqlalchemy import select, update, func, distinct, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.database import get_async_session
-from cache.cache import get_cache_instance
-from models.models import Book, Author, User, Role, Review, Genre, GenreToBook
+from cache.cache import get_cache_instance, get_cached_document, set_cached_document, invalidate_cached_documents
+from cache.genres import bump_genres_version, get_genres as get_genres_dictionary
+from models.models import Book, Author, User, Role, Genre, GenreToBook
 from routes.auth_router import current_user
 from routes.models.genres.create_genre_model import CreateGenreResponseModel, CreateGenreRequestModel
 from routes.models.genres.delete_genre_model import DeleteGenreResponseModel
+from routes.models.genres.get_genre_books_model import GetGenreBooksResponseModel
 from routes.models.genres.get_genre_model import GetGenreResponseModel
 from routes.models.genres.get_genres_model import GetGenresResponseModel
 from routes.models.genres.update_genre_model import UpdateGenreRequestModel, UpdateGenreResponseModel
+from routes.utils.books import select_books_genres
+from routes.utils.etags import make_etag, etag_matches, not_modified_response
+from routes.utils.pagination import encode_cursor, decode_cursor
 
 genres_router = APIRouter()
 
+# Default number of books in a page of genre books
+GENRE_BOOKS_PAGE_SIZE = 50
+
 
 @genres_router.get("/{genre_id}")
 async def get_genre(genre_id: int,
+                    request: Request,
                     response: Response,
                     session: AsyncSession = Depends(get_async_session)) -> GetGenreResponseModel:
 
-    # # Check for existing in cache
-    # cache = get_cache_instance()
-    # from_cache = cache.get(f'/genres/{genre_id}')
-    # if from_cache is not None:
-    #     return GetGenreResponseModel.parse_json(from_cache)
+    # Answer with headers only if client copy of the genre is up to date
+    statement = select(Genre.version).where(Genre.id == genre_id)
+    versions = (await session.execute(statement)).one_or_none()
+    if versions is not None:
+        etag = make_etag(*versions)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        response.headers["ETag"] = etag
+
+    # Check for existing in cache (documents of other versions are ignored)
+    cache = get_cache_instance()
+    if versions is not None:
+        from_cache = await get_cached_document(cache, f'/genres/{genre_id}', GetGenreResponseModel, version=etag)
+        if from_cache is not None:
+            return from_cache
 
     genre = await session.get(Genre, genre_id)
     if genre is None:
@@ -43,8 +63,9 @@ async def get_genre(genre_id: int,
         name=genre.name
     )
 
-    # # Cache response
-    # cache.set(f"/genres/{genre.id}", json.dumps(res.as_dict()))
+    # Cache response (with version of the data it was built from)
+    if versions is not None:
+        await set_cached_document(cache, f'/genres/{genre.id}', res, dependencies=[('genre', genre.id)], version=etag)
 
     return res
 
@@ -53,49 +74,93 @@ async def get_genre(genre_id: int,
 async def get_genres(response: Response,
                      session: AsyncSession = Depends(get_async_session)) -> List[GetGenresResponseModel]:
 
-    statement = select(Genre)
-    genres = (await session.execute(statement)).scalars().all()
-    res = []
-    for genre in genres:
-
-        statement = select(Book).where(GenreToBook.book_id == Book.id, GenreToBook.genre_id == genre.id)
-        books = (await session.execute(statement)).scalars().all()
-        books_list = []
-        for book in books:
-            # Select book reviews and collect additional data
-            statement = select(Review).where(Review.book_id == book.id)
-            reviews = (await session.execute(statement)).scalars().all()
-            reviews_count = len(reviews)
-            book_rating = (sum([review.rating for review in reviews]) / reviews_count) if reviews_count > 0 else 0
-
-            # Select book genres
-            statement = select(Genre).where(GenreToBook.book_id == book.id, Genre.id == GenreToBook.genre_id)
-            genres = (await session.execute(statement)).scalars().all()
-
-            book_model = GetGenresResponseModel.BookModel(
-                id=book.id,
-                title=book.title,
-                genres=[
-                    GetGenresResponseModel.GenreModel(
-                        id=genre.id,
-                        name=genre.name
-                    ) for genre in genres
-                ],
-                rating=book_rating,
-                reviews_count=reviews_count,
-            )
-            books_list.append(book_model)
+    # Count books of every genre with a single query over genre links (genre names come from genres dictionary)
+    genres = await get_genres_dictionary(session)
+    statement = select(GenreToBook.genre_id, func.count(distinct(GenreToBook.book_id)))\
+        .group_by(GenreToBook.genre_id)
+    books_counts = dict((await session.execute(statement)).all())
 
-        genre_model = GetGenresResponseModel(
+    # Format response
+    response.status_code = status.HTTP_200_OK
+    res = [
+        GetGenresResponseModel(
             id=genre.id,
             name=genre.name,
-            books=books_list
+            books_count=books_counts.get(genre.id, 0)
+        ) for genre in sorted(genres.values())
+    ]
+
+    return res
+
+
+@genres_router.get("/{genre_id}/books")
+async def get_genre_books(genre_id: int,
+                          response: Response,
+                          cursor: Union[None, str] = None,
+                          limit: int = Query(default=GENRE_BOOKS_PAGE_SIZE, ge=1, le=500),
+                          session: AsyncSession = Depends(get_async_session)) -> GetGenreBooksResponseModel:
+
+    # Check for corresponding genre existence
+    genres = await get_genres_dictionary(session, [genre_id])
+    if genre_id not in genres:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Genre with id={genre_id} not found"
         )
 
-        res.append(genre_model)
+    # Select page of genre books ordered by id (genre links index serves both filtering and ordering)
+    statement = select(GenreToBook.book_id)\
+        .where(GenreToBook.genre_id == genre_id)\
+        .distinct()\
+        .order_by(GenreToBook.book_id)
+    if cursor is not None:
+        last_id, = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid request payload. Malformed cursor"
+            )
+        statement = statement.where(GenreToBook.book_id > last_id)
+
+    # Select one extra book to find out whether the next page exists
+    book_ids = (await session.execute(statement.limit(limit + 1))).scalars().all()
+    next_cursor = None
+    if len(book_ids) > limit:
+        book_ids = book_ids[:limit]
+        next_cursor = encode_cursor(book_ids[-1])
+
+    # Select books with authors and genres of all selected books
+    statement = select(Book, Author)\
+        .join(Author, Author.id == Book.author_id)\
+        .where(Book.id == any_(literal(book_ids, ARRAY(Integer))))\
+        .order_by(Book.id)
+    books_rows = (await session.execute(statement)).all()
+    books_genres = await select_books_genres(session, book_ids)
 
     # Format response
     response.status_code = status.HTTP_200_OK
+    res = GetGenreBooksResponseModel(
+        books=[
+            GetGenreBooksResponseModel.BookModel(
+                id=book.id,
+                title=book.title,
+                author=GetGenreBooksResponseModel.AuthorModel(
+                    id=author.id,
+                    name=author.name
+                ),
+                genres=[
+                    GetGenreBooksResponseModel.GenreModel(
+                        id=genre.id,
+                        name=genre.name
+                    ) for genre in books_genres.get(book.id, [])
+                ],
+                rating=round(book.rating, 2),
+                reviews_count=book.reviews_count,
+                year=book.year
+            ) for book, author in books_rows
+        ],
+        next_cursor=next_cursor
+    )
 
     return res
 
@@ -123,6 +188,9 @@ async def create_genre(new_genre: CreateGenreRequestModel,
     # Committing changes
     await session.commit()
 
+    # Invalidate genres dictionaries
+    await bump_genres_version(get_cache_instance())
+
     # Format response
     response.status_code = status.HTTP_200_OK
     res = CreateGenreResponseModel(
@@ -159,12 +227,20 @@ async def update_genre(genre_id: int,
     # Updating simple fields
     genre.name = new_genre.name
 
+    # Bump versions of the genre and books of the genre (books documents embed genre name)
+    genre.version = Genre.version + 1
+    statement = update(Book)\
+        .where(Book.id.in_(select(GenreToBook.book_id).where(GenreToBook.genre_id == genre.id)))\
+        .values(version=Book.version + 1)
+    await session.execute(statement)
+
     # Committing changes
     await session.commit()
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/genres/{genre.id}')
+    # Invalidate genres dictionaries and then cache (documents rebuilt before the bump may embed old names)
+    cache = get_cache_instance()
+    await bump_genres_version(cache)
+    await invalidate_cached_documents(cache, ('genre', genre_id))
 
     # Format response
     response.status_code = status.HTTP_200_OK
@@ -201,13 +277,21 @@ async def delete_genre(genre_id: int,
     # Get name before delete
     genre_name = genre.name
 
+    # Bump versions of books of the genre and mark their similar books for recomputation
+    # (genre links are deleted in cascade)
+    statement = update(Book)\
+        .where(Book.id.in_(select(GenreToBook.book_id).where(GenreToBook.genre_id == genre.id)))\
+        .values(version=Book.version + 1, similar_stale=True)
+    await session.execute(statement)
+
     # Committing changes
     await session.delete(genre)
     await session.commit()
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/genres/{genre.id}')
+    # Invalidate genres dictionaries and then cache (documents rebuilt before the bump may embed old names)
+    cache = get_cache_instance()
+    await bump_genres_version(cache)
+    await invalidate_cached_documents(cache, ('genre', genre_id))
 
     # Format response
     response.status_code = status.HTTP_200_OK
@@ -1,5 +1,4 @@
-import json
-from typing import List
+from typing import List, Union
 
 from pydantic import BaseModel
 
@@ -13,56 +12,26 @@ class GetAuthorResponseModel(BaseModel):
     class BookModel(BaseModel):
         id: int
         title: str
-        genres: List['GetAuthorResponseModel.GenreModel']
+        genres: Union[None, List['GetAuthorResponseModel.GenreModel']] = None
         rating: float
         reviews_count: int
 
+    class StatsModel(BaseModel):
+        books_count: int
+        rating: float
+        reviews_count: int
+        first_year: Union[None, int]
+        last_year: Union[None, int]
+
     id: int
     name: str
     about: str
-    books: List[BookModel]
+    stats: Union[None, StatsModel] = None
+    books: Union[None, List[BookModel]] = None
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'about': self.about,
-            'books': [
-                {
-                    'id': book.id,
-                    'title': book.title,
-                    'genres': [
-                        {
-                            'id': genre.id,
-                            'name': genre.name
-                        } for genre in book.genres
-                    ],
-                    'rating': book.rating,
-                    'reviews_count': book.reviews_count
-                } for book in self.books
-            ]
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        author = json.loads(json_repr)
-        return GetAuthorResponseModel(
-            id=int(author['id']),
-            name=author['name'],
-            about=author['about'],
-            books=[
-                GetAuthorResponseModel.BookModel(
-                    id=book['id'],
-                    title=book['title'],
-                    genres=[
-                       GetAuthorResponseModel.GenreModel(
-                           id=genre['id'],
-                           name=genre['name']
-                       ) for genre in book['genres']
-                    ],
-                    rating=book['rating'],
-                    reviews_count=book['reviews_count']
-                ) for book in author['books']
-            ]
-        )
-
+        return GetAuthorResponseModel.model_validate_json(json_repr)
@@ -1,5 +1,5 @@
 import json
-from typing import List
+from typing import List, Union
 
 from pydantic import BaseModel
 
@@ -13,57 +13,31 @@ class GetAuthorsResponseModel(BaseModel):
     class BookModel(BaseModel):
         id: int
         title: str
-        genres: List['GetAuthorsResponseModel.GenreModel']
+        genres: Union[None, List['GetAuthorsResponseModel.GenreModel']] = None
         rating: float
         reviews_count: int
 
+    class StatsModel(BaseModel):
+        books_count: int
+        rating: float
+        reviews_count: int
+        first_year: Union[None, int]
+        last_year: Union[None, int]
+
     id: int
     name: str
     about: str
-    books: List[BookModel]
+    stats: Union[None, StatsModel] = None
+    books: Union[None, List[BookModel]] = None
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'about': self.about,
-            'books': [
-                {
-                    'id': book.id,
-                    'title': book.title,
-                    'genres': [
-                        {
-                            'id': genre.id,
-                            'name': genre.name
-                        } for genre in book.genres
-                    ],
-                    'rating': book.rating,
-                    'reviews_count': book.reviews_count
-                } for book in self.books
-            ]
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        authors_arr = json.loads(json_repr)
-        return [
-            GetAuthorsResponseModel(
-                id=int(author['id']),
-                name=author['name'],
-                about=author['about'],
-                books=[
-                    GetAuthorsResponseModel.BookModel(
-                        id=book['id'],
-                        title=book['title'],
-                        genres=[
-                           GetAuthorsResponseModel.GenreModel(
-                               id=genre['id'],
-                               name=genre['name']
-                           ) for genre in book['genres']
-                        ],
-                        rating=book['rating'],
-                        reviews_count=book['reviews_count']
-                    ) for book in author['books']
-                ]
-            ) for author in authors_arr
-        ]
+        return [GetAuthorsResponseModel.model_validate(author) for author in json.loads(json_repr)]
+
+
+class GetAuthorsPageResponseModel(BaseModel):
+    authors: List[GetAuthorsResponseModel]
+    next_cursor: Union[None, str]
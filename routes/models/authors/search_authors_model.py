@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class SearchAuthorsResponseModel(BaseModel):
+    id: int
+    name: str
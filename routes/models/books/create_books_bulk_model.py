@@ -0,0 +1,24 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from routes.models.books.create_book_model import CreateBookRequestModel
+
+
+class CreateBooksBulkRequestModel(BaseModel):
+    books: List[CreateBookRequestModel]
+    batch_size: int = Field(default=1000, ge=1, le=10000)
+
+
+class CreateBooksBulkResponseModel(BaseModel):
+
+    class CreatedModel(BaseModel):
+        index: int
+        id: int
+
+    class ErrorModel(BaseModel):
+        index: int
+        detail: str
+
+    created: List[CreatedModel]
+    errors: List[ErrorModel]
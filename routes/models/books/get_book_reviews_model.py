@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import List, Union
+
+from pydantic import BaseModel
+
+
+class GetBookReviewsResponseModel(BaseModel):
+
+    class UserModel(BaseModel):
+        id: int
+        name: str
+
+    class ReviewModel(BaseModel):
+        id: int
+        user: 'GetBookReviewsResponseModel.UserModel'
+        rating: int
+        text: str
+        created: datetime
+
+    reviews: List[ReviewModel]
+    next_cursor: Union[None, str]
@@ -0,0 +1,10 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from routes.models.books.get_books_model import GetBooksResponseModel
+
+
+class GetBooksBatchResponseModel(BaseModel):
+    books: List[GetBooksResponseModel]
+    missing_ids: List[int]
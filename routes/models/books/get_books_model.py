@@ -1,15 +1,22 @@
 import json
-from typing import List, Union
+from typing import List, Union, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class GetBooksRequestModel(BaseModel):
     search_query: Union[None, str]
     genre_ids: Union[None, List[int]]
+    genre_match: Literal['any', 'all'] = 'any'
     year_from: Union[None, int]
     year_to: Union[None, int]
     author_ids: Union[None, List[int]]
+    search_mode: Literal['title', 'fulltext'] = 'title'
+    sort_by: Union[None, Literal['title', 'year', 'rating', 'reviews_count', 'relevance']] = None
+    limit: int = Field(default=50, ge=1, le=500)
+    cursor: Union[None, str] = None
+    facets: bool = False
+    year_bucket_size: int = Field(default=10, ge=1)
 
 
 class GetBooksResponseModel(BaseModel):
@@ -31,69 +38,36 @@ class GetBooksResponseModel(BaseModel):
     year: int
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'author': {
-                'id': self.author.id,
-                'name': self.author.name,
-            },
-            'genres': [
-                {
-                    'id': genre.id,
-                    'name': genre.name
-                } for genre in self.genres
-            ],
-            'rating': self.rating,
-            'reviews_count': self.reviews_count,
-            'reviews': [
-                {
-                    'id': review.id,
-                    'user': {
-                        'id': review.user.id,
-                        'name': review.user.name
-                    },
-                    'rating': review.rating,
-                    'text': review.text,
-                    'created': review.created
-                } for review in self.reviews
-            ],
-            'year': self.year,
-            'annotation': self.annotation
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        books = json.loads(json_repr)
-        return [
-            GetBooksResponseModel(
-                id=int(book['id']),
-                title=book['title'],
-                author=GetBooksResponseModel.AuthorModel(
-                    id=int(book['author']['id']),
-                    name=book['author']['name']
-                ),
-                genres=[
-                    GetBooksResponseModel.GenreModel(
-                        id=int(genre['id']),
-                        name=genre['name']
-                    ) for genre in book['genres']
-                ],
-                rating=float(book['rating']),
-                reviews_count=int(book['reviews_count']),
-                reviews=[
-                    GetBooksResponseModel.ReviewModel(
-                        id=int(review['id']),
-                        user=GetBooksResponseModel.UserModel(
-                            id=int(review['user']['id']),
-                            name=review['user']['name'],
-                        ),
-                        rating=int(review['rating']),
-                        text=review['text'],
-                        created=review['created'],
-                    ) for review in book['reviews']
-                ],
-                year=int(book['year']),
-                annotation=book['annotation']
-            ) for book in books
-        ]
\ No newline at end of file
+        return [GetBooksResponseModel.model_validate(book) for book in json.loads(json_repr)]
+
+
+class GetBooksFacetsModel(BaseModel):
+
+    class GenreFacetModel(BaseModel):
+        id: int
+        name: str
+        count: int
+
+    class AuthorFacetModel(BaseModel):
+        id: int
+        name: str
+        count: int
+
+    class YearFacetModel(BaseModel):
+        year_from: int
+        year_to: int
+        count: int
+
+    genres: List[GenreFacetModel]
+    authors: List[AuthorFacetModel]
+    years: List[YearFacetModel]
+
+
+class GetBooksPageResponseModel(BaseModel):
+    books: List[GetBooksResponseModel]
+    next_cursor: Union[None, str]
+    facets: Union[None, GetBooksFacetsModel] = None
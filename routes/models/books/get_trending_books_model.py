@@ -0,0 +1,23 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class GetTrendingBooksResponseModel(BaseModel):
+
+    class AuthorModel(BaseModel):
+        id: int
+        name: str
+
+    class GenreModel(BaseModel):
+        id: int
+        name: str
+
+    id: int
+    title: str
+    author: AuthorModel
+    genres: List[GenreModel]
+    rating: float
+    reviews_count: int
+    year: int
+    score: float
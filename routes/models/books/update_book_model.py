@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import List, Union
 
 from pydantic import BaseModel
 
@@ -40,5 +40,6 @@ class UpdateBookResponseModel(BaseModel):
     rating: float
     reviews_count: int
     reviews: List[ReviewModel]
+    reviews_next_cursor: Union[None, str] = None
     year: int
     annotation: str
@@ -1,5 +1,4 @@
-import json
-from typing import List
+from typing import List, Union
 
 from pydantic import BaseModel
 
@@ -13,52 +12,17 @@ class GetCollectionResponseModel(BaseModel):
     class BookModel(BaseModel):
         id: int
         title: str
-        genres: List['GetCollectionResponseModel.GenreModel']
+        genres: Union[None, List['GetCollectionResponseModel.GenreModel']] = None
         rating: float
         reviews_count: int
 
     id: int
     title: str
-    books: List[BookModel]
+    books: Union[None, List[BookModel]] = None
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'books': [
-                {
-                    'id': book.id,
-                    'title': book.title,
-                    'genres': [
-                        {
-                            'id': genre.id,
-                            'name': genre.name
-                        } for genre in book.genres
-                    ],
-                    'rating': book.rating,
-                    'reviews_count': book.reviews_count
-                } for book in self.books
-            ]
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        collection = json.loads(json_repr)
-        return GetCollectionResponseModel(
-            id=int(collection['id']),
-            title=collection['title'],
-            books=[
-                GetCollectionResponseModel.BookModel(
-                    id=book['id'],
-                    title=book['title'],
-                    genres=[
-                       GetCollectionResponseModel.GenreModel(
-                           id=genre['id'],
-                           name=genre['name']
-                       ) for genre in book['genres']
-                    ],
-                    rating=book['rating'],
-                    reviews_count=book['reviews_count']
-                ) for book in collection['books']
-            ]
-        )
+        return GetCollectionResponseModel.model_validate_json(json_repr)
@@ -22,45 +22,20 @@ class GetCollectionsResponseModel(BaseModel):
     books: List[BookModel]
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'books': [
-                {
-                    'id': book.id,
-                    'title': book.title,
-                    'genres': [
-                        {
-                            'id': genre.id,
-                            'name': genre.name
-                        } for genre in book.genres
-                    ],
-                    'rating': book.rating,
-                    'reviews_count': book.reviews_count
-                } for book in self.books
-            ]
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        collections = json.loads(json_repr)
-        return [
-            GetCollectionsResponseModel(
-                id=int(collection['id']),
-                title=collection['title'],
-                books=[
-                    GetCollectionsResponseModel.BookModel(
-                        id=book['id'],
-                        title=book['title'],
-                        genres=[
-                           GetCollectionsResponseModel.GenreModel(
-                               id=genre['id'],
-                               name=genre['name']
-                           ) for genre in book['genres']
-                        ],
-                        rating=book['rating'],
-                        reviews_count=book['reviews_count']
-                    ) for book in collection['books']
-                ]
-            ) for collection in collections
-        ]
+        return [GetCollectionsResponseModel.model_validate(collection) for collection in json.loads(json_repr)]
+
+
+class GetCollectionsSummaryResponseModel(BaseModel):
+
+    class BookModel(BaseModel):
+        id: int
+        title: str
+
+    id: int
+    title: str
+    books_count: int
+    books: List[BookModel]
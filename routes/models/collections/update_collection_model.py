@@ -1,4 +1,3 @@
-import json
 from typing import List
 
 from pydantic import BaseModel
@@ -27,43 +26,8 @@ class UpdateCollectionResponseModel(BaseModel):
     books: List[BookModel]
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'books': [
-                {
-                    'id': book.id,
-                    'title': book.title,
-                    'genres': [
-                        {
-                            'id': genre.id,
-                            'name': genre.name
-                        } for genre in book.genres
-                    ],
-                    'rating': book.rating,
-                    'reviews_count': book.reviews_count
-                } for book in self.books
-            ]
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        collection = json.loads(json_repr)
-        return UpdateCollectionResponseModel(
-            id=int(collection['id']),
-            title=collection['title'],
-            books=[
-                UpdateCollectionResponseModel.BookModel(
-                    id=book['id'],
-                    title=book['title'],
-                    genres=[
-                       UpdateCollectionResponseModel.GenreModel(
-                           id=genre['id'],
-                           name=genre['name']
-                       ) for genre in book['genres']
-                    ],
-                    rating=book['rating'],
-                    reviews_count=book['reviews_count']
-                ) for book in collection['books']
-            ]
-        )
\ No newline at end of file
+        return UpdateCollectionResponseModel.model_validate_json(json_repr)
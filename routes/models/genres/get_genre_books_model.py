@@ -0,0 +1,26 @@
+from typing import List, Union
+
+from pydantic import BaseModel
+
+
+class GetGenreBooksResponseModel(BaseModel):
+
+    class AuthorModel(BaseModel):
+        id: int
+        name: str
+
+    class GenreModel(BaseModel):
+        id: int
+        name: str
+
+    class BookModel(BaseModel):
+        id: int
+        title: str
+        author: 'GetGenreBooksResponseModel.AuthorModel'
+        genres: List['GetGenreBooksResponseModel.GenreModel']
+        rating: float
+        reviews_count: int
+        year: int
+
+    books: List[BookModel]
+    next_cursor: Union[None, str]
@@ -1,5 +1,3 @@
-import json
-
 from pydantic import BaseModel
 
 
@@ -8,15 +6,8 @@ class GetGenreResponseModel(BaseModel):
     name: str
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        genre = json.loads(json_repr)
-        return GetGenreResponseModel(
-            id=int(genre['id']),
-            name=genre['name']
-        )
+        return GetGenreResponseModel.model_validate_json(json_repr)
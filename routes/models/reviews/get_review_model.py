@@ -1,4 +1,3 @@
-import json
 from datetime import datetime
 
 from pydantic import BaseModel
@@ -18,29 +17,8 @@ class GetReviewResponseModel(BaseModel):
     created: datetime
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'user': {
-                'id': self.user.id,
-                'name': self.user.name
-            },
-            'book_id': self.book_id,
-            'rating': self.rating,
-            'text': self.text,
-            'created': str(self.created)
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        review = json.loads(json_repr)
-        return GetReviewResponseModel(
-            id=int(review['id']),
-            user=GetReviewResponseModel.UserModel(
-                id=review['user']['id'],
-                name=review['user']['name']
-            ),
-            book_id=int(review['book_id']),
-            rating=int(review['rating']),
-            text=review['text'],
-            created=review['created']
-        )
\ No newline at end of file
+        return GetReviewResponseModel.model_validate_json(json_repr)
@@ -18,31 +18,8 @@ class GetReviewsResponseModel(BaseModel):
     created: datetime
 
     def as_dict(self):
-        return {
-            'id': self.id,
-            'user': {
-                'id': self.user.id,
-                'name': self.user.name
-            },
-            'book_id': self.book_id,
-            'rating': self.rating,
-            'text': self.text,
-            'created': str(self.created)
-        }
+        return self.model_dump(mode='json')
 
     @staticmethod
     def parse_json(json_repr):
-        reviews = json.loads(json_repr)
-        return [
-            GetReviewsResponseModel(
-                id=int(review['id']),
-                user=GetReviewsResponseModel.UserModel(
-                    id=review['user']['id'],
-                    name=review['user']['name']
-                ),
-                book_id=int(review['book_id']),
-                rating=int(review['rating']),
-                text=review['text'],
-                created=review['created']
-            ) for review in reviews
-        ]
+        return [GetReviewsResponseModel.model_validate(review) for review in json.loads(json_repr)]
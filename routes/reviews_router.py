@@ -1,19 +1,21 @@
 import json
-from datetime import datetime
-from typing import List
+from datetime import datetime, timezone
+from typing import List, AsyncIterator
 
-from fastapi import APIRouter, Response, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Response, Request, Depends, HTTPException, status
+from sqlalchemy import select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.database import get_async_session
-from cache.cache import get_cache_instance
-from models.models import Review, User, Book, Role
+from auth.database import get_async_session, async_session_maker
+from cache.cache import get_cache_instance, get_cached_document, set_cached_document, invalidate_cached_documents
+from cache.trending import add_trending_review
+from models.models import Review, User, Book, Author, Role
 from routes.auth_router import current_user
 from routes.models.reviews.create_review_model import CreateReviewRequestModel, CreateReviewResponseModel
 from routes.models.reviews.delete_review_model import DeleteReviewModelResponse
 from routes.models.reviews.get_review_model import GetReviewResponseModel
 from routes.models.reviews.get_reviews_model import GetReviewsResponseModel
+from routes.utils.streaming import accepts_ndjson, stream_partitions, ndjson_response
 
 reviews_router = APIRouter()
 
@@ -23,11 +25,11 @@ async def get_review(review_id: int,
                      response: Response,
                      session: AsyncSession = Depends(get_async_session)) -> GetReviewResponseModel:
 
-    # # Check for existing in cache
-    # cache = get_cache_instance()
-    # from_cache = cache.get(f'/reviews/{review_id}')
-    # if from_cache is not None:
-    #     return GetReviewResponseModel.parse_json(from_cache)
+    # Check for existing in cache
+    cache = get_cache_instance()
+    from_cache = await get_cached_document(cache, f'/reviews/{review_id}', GetReviewResponseModel)
+    if from_cache is not None:
+        return from_cache
 
     # Check for corresponding review existence
     review = await session.get(Review, review_id)
@@ -53,17 +55,41 @@ async def get_review(review_id: int,
         created=review.created
     )
 
-    # # Cache response
-    # cache.set(f"/reviews/{review.id}", json.dumps(res.as_dict()))
+    # Cache response
+    await set_cached_document(cache, f'/reviews/{review.id}', res, dependencies=[('review', review.id)])
 
     return res
 
 
+async def _stream_reviews(statement) -> AsyncIterator[GetReviewsResponseModel]:
+    # Stream is read after the request handler returns, so it holds its own session
+    async with async_session_maker() as session:
+        async for reviews_to_users in stream_partitions(session, statement):
+            for review, user in reviews_to_users:
+                yield GetReviewsResponseModel(
+                    id=review.id,
+                    user=GetReviewsResponseModel.UserModel(
+                        id=user.id,
+                        name=user.name
+                    ),
+                    book_id=review.book_id,
+                    rating=review.rating,
+                    text=review.text,
+                    created=review.created
+                )
+
+
 @reviews_router.get("/")
-async def get_reviews(response: Response,
+async def get_reviews(request: Request,
+                      response: Response,
                       session: AsyncSession = Depends(get_async_session)) -> List[GetReviewsResponseModel]:
 
     statement = select(Review, User).outerjoin(User, Review.user_id == User.id)
+
+    # Stream reviews line by line
+    if accepts_ndjson(request):
+        return ndjson_response(_stream_reviews(statement.order_by(Review.id)))
+
     reviews_to_users = (await session.execute(statement)).all()
 
     res = []
@@ -110,22 +136,47 @@ async def create_review(new_review: CreateReviewRequestModel,
             detail=f"Invalid request payload. Rating value should be between 1 and 5 inclusively"
         )
 
-    # Review creation
+    # Updating book reviews stats and book version first (locks the book, so a book deleted concurrently
+    # is not updated and is reported as missing)
+    statement = update(Book).where(Book.id == book.id).values(
+        rating_sum=Book.rating_sum + new_review.rating,
+        reviews_count=Book.reviews_count + 1,
+        version=Book.version + 1
+    )\
+        .returning(Book.author_id)\
+        .execution_options(synchronize_session=False)
+    author_id = (await session.execute(statement)).scalar_one_or_none()
+    if author_id is None:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request payload. Book with id={new_review.book_id} does not exist"
+        )
+
+    # Review creation and updating author reviews stats within the same transaction
     review = Review(
         user_id=user.id,
         book_id=book.id,
         rating=new_review.rating,
         text=new_review.text,
-        created=datetime.now()
+        created=datetime.now(timezone.utc)
     )
     session.add(review)
+    statement = update(Author).where(Author.id == author_id).values(
+        rating_sum=Author.rating_sum + review.rating,
+        reviews_count=Author.reviews_count + 1
+    )
+    await session.execute(statement)
 
     # Committing changes
     await session.commit()
 
-    # Invalidate cache
+    # Invalidate cache (every document embedding book rating)
     cache = get_cache_instance()
-    cache.delete(f'/books/{book.id}')
+    await invalidate_cached_documents(cache, ('book', book.id))
+
+    # Update trending books leaderboards
+    await add_trending_review(cache, book.id, review.created)
 
     # Format response
     response.status_code = status.HTTP_200_OK
@@ -167,16 +218,43 @@ async def delete_review(review_id: int,
         )
 
     review_owner = await session.get(User, review.user_id)
-    book_id = review.book_id
+
+    # Delete the review first, so that of concurrent deletions only the one that actually removed it updates stats
+    statement = delete(Review)\
+        .where(Review.id == review_id)\
+        .returning(Review.book_id, Review.rating, Review.created)\
+        .execution_options(synchronize_session=False)
+    deleted = (await session.execute(statement)).one_or_none()
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Review with id={review_id} does not exist"
+        )
+    book_id, rating, created = deleted
+
+    # Updating book and author reviews stats and book version within the same transaction
+    statement = update(Book).where(Book.id == book_id).values(
+        rating_sum=Book.rating_sum - rating,
+        reviews_count=Book.reviews_count - 1,
+        version=Book.version + 1
+    )
+    await session.execute(statement)
+    statement = update(Author).where(Author.id == select(Book.author_id).where(Book.id == book_id).scalar_subquery())\
+        .values(
+            rating_sum=Author.rating_sum - rating,
+            reviews_count=Author.reviews_count - 1
+        )
+    await session.execute(statement)
 
     # Committing changes
-    await session.delete(review)
     await session.commit()
 
-    # # Invalidate cache
-    # cache = get_cache_instance()
-    # cache.delete(f'/reviews/{review_id}')
-    # cache.delete(f'/books/{book_id}')
+    # Invalidate cache
+    cache = get_cache_instance()
+    await invalidate_cached_documents(cache, ('review', review_id), ('book', book_id))
+
+    # Update trending books leaderboards
+    await add_trending_review(cache, book_id, created, sign=-1)
 
     # Format response
     response.status_code = status.HTTP_200_OK
@@ -0,0 +1,49 @@
+from typing import Iterable
+
+from sqlalchemy import select, update, func, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import Author, Book
+
+
+async def refresh_authors_stats(session: AsyncSession, author_ids: Iterable[int]):
+    # Recompute stats of given authors from their books (books keep their own reviews stats,
+    # so reviews are not scanned). Authors without books get empty stats
+    author_ids = list(author_ids)
+    if len(author_ids) == 0:
+        return
+
+    # Lock authors before aggregating (in id order). Reviews update author stats incrementally after their books,
+    # so the aggregate, taken after the locks, either sees both updates of a review or the review waits for
+    # the lock and applies its increment on top of the recomputed stats. The lock is the one UPDATE takes
+    # (FOR NO KEY UPDATE), so it does not conflict with foreign key checks of concurrently inserted books
+    statement = select(Author.id)\
+        .where(Author.id == any_(literal(author_ids, ARRAY(Integer))))\
+        .order_by(Author.id)\
+        .with_for_update(key_share=True)
+    await session.execute(statement)
+
+    stats = select(
+        Author.id.label("author_id"),
+        func.count(Book.id).label("books_count"),
+        func.coalesce(func.sum(Book.rating_sum), 0).label("rating_sum"),
+        func.coalesce(func.sum(Book.reviews_count), 0).label("reviews_count"),
+        func.min(Book.year).label("first_year"),
+        func.max(Book.year).label("last_year")
+    )\
+        .outerjoin(Book, Book.author_id == Author.id)\
+        .where(Author.id == any_(literal(author_ids, ARRAY(Integer))))\
+        .group_by(Author.id)\
+        .subquery()
+    statement = update(Author)\
+        .where(Author.id == stats.c.author_id)\
+        .values(
+            books_count=stats.c.books_count,
+            rating_sum=stats.c.rating_sum,
+            reviews_count=stats.c.reviews_count,
+            first_year=stats.c.first_year,
+            last_year=stats.c.last_year
+        )\
+        .execution_options(synchronize_session=False)
+    await session.execute(statement)
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from typing import Dict, List, Iterable, Sequence, Tuple
+
+from sqlalchemy import select, insert, update, any_, literal, Integer
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache.genres import GenreEntry, get_genres
+from models.models import Author, Book, GenreToBook
+from routes.utils.authors import refresh_authors_stats
+from routes.models.books.create_book_model import CreateBookRequestModel
+
+
+async def select_books_genres(session: AsyncSession, book_ids: Iterable[int],
+                              fresh: bool = False) -> Dict[int, List[GenreEntry]]:
+    # Select genre links of all given books with a single query (genre names come from genres dictionary,
+    # which is checked for changes at once if fresh names are required, e.g. for documents going to cache)
+    book_ids = list(book_ids)
+    if len(book_ids) == 0:
+        return {}
+
+    statement = select(GenreToBook.book_id, GenreToBook.genre_id)\
+        .where(GenreToBook.book_id == any_(literal(book_ids, ARRAY(Integer))))\
+        .order_by(GenreToBook.id)
+    links = (await session.execute(statement)).all()
+    genres = await get_genres(session, {genre_id for _, genre_id in links}, fresh)
+    books_genres = defaultdict(list)
+    for book_id, genre_id in links:
+        if genre_id in genres:
+            books_genres[book_id].append(genres[genre_id])
+
+    return books_genres
+
+
+async def insert_books(session: AsyncSession, books: Sequence[CreateBookRequestModel],
+                       batch_size: int) -> Tuple[Dict[int, int], Dict[int, str]]:
+    # Insert books with genre links committing every batch, returns ids of created books
+    # and errors of rejected books (both by index of the book in the given sequence)
+
+    # Select existing authors with a single query (genres are checked against genres dictionary)
+    author_ids = list({book.author_id for book in books})
+    statement = select(Author.id).where(Author.id == any_(literal(author_ids, ARRAY(Integer))))
+    existing_authors = set((await session.execute(statement)).scalars().all())
+    genre_ids = {genre_id for book in books for genre_id in book.genre_ids}
+    existing_genres = await get_genres(session, genre_ids, fresh=True)
+
+    # Check every book against found authors and genres
+    created_ids = {}
+    errors = {}
+    valid_indexes = []
+    for index, book in enumerate(books):
+        if book.author_id not in existing_authors:
+            errors[index] = f"Author with id={book.author_id} does not exist"
+            continue
+        missing_genres = [
+            str(genre_id) for genre_id in dict.fromkeys(book.genre_ids) if genre_id not in existing_genres
+        ]
+        if len(missing_genres) > 0:
+            errors[index] = f"Genres with id={', '.join(missing_genres)} do not exist"
+            continue
+        valid_indexes.append(index)
+
+    for start in range(0, len(valid_indexes), batch_size):
+        batch = valid_indexes[start:start + batch_size]
+
+        try:
+            # Insert books with multi-row INSERT ... RETURNING (ids come in the order of rows)
+            statement = insert(Book).returning(Book.id, sort_by_parameter_order=True)
+            book_ids = (await session.execute(statement, [
+                dict(
+                    title=books[index].title,
+                    author_id=books[index].author_id,
+                    year=books[index].year,
+                    annotation=books[index].annotation
+                ) for index in batch
+            ])).scalars().all()
+
+            # Insert books-genres records
+            genres_to_books = [
+                dict(
+                    genre_id=genre_id,
+                    book_id=book_id
+                ) for index, book_id in zip(batch, book_ids) for genre_id in dict.fromkeys(books[index].genre_ids)
+            ]
+            if len(genres_to_books) > 0:
+                await session.execute(insert(GenreToBook), genres_to_books)
+
+            # Bump authors versions and refresh authors stats (author documents list author books)
+            batch_authors = {books[index].author_id for index in batch}
+            statement = update(Author)\
+                .where(Author.id.in_(batch_authors))\
+                .values(version=Author.version + 1)
+            await session.execute(statement)
+            await refresh_authors_stats(session, batch_authors)
+
+            # Committing batch
+            await session.commit()
+        except IntegrityError:
+            # Author or genre was deleted concurrently after the check, the whole batch is rejected
+            await session.rollback()
+            for index in batch:
+                errors[index] = "Author or genres of the book were deleted concurrently"
+            continue
+        created_ids.update(zip(batch, book_ids))
+
+    return created_ids, errors
@@ -0,0 +1,27 @@
+from typing import Union
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*versions: int, variant: Union[None, str] = None) -> str:
+    # Strong entity tag built from versions of the entity and of everything embedded in its document
+    # (partial representations of the document are told apart by variant)
+    etag = '.'.join(str(version) for version in versions)
+    if variant is not None:
+        etag += f';{variant}'
+    return f'"{etag}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison is used for If-None-Match
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
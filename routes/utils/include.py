@@ -0,0 +1,26 @@
+from typing import Iterable, Set, Union
+
+from fastapi import HTTPException, status
+
+
+def parse_include(include: Union[None, str], sections: Iterable[str]) -> Set[str]:
+    # Nested sections of the document requested by client (all sections by default)
+    sections = set(sections)
+    if include is None:
+        return sections
+    requested = {section.strip() for section in include.split(",") if section.strip() != ""}
+    unknown = requested - sections
+    if len(unknown) > 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request payload. Unknown sections {', '.join(sorted(unknown))} "
+                   f"(available sections are {', '.join(sorted(sections))})"
+        )
+    return requested
+
+
+def include_variant(include: Set[str], sections: Iterable[str]) -> Union[None, str]:
+    # Variant of the document representation (None for the full document)
+    if include == set(sections):
+        return None
+    return '+'.join(sorted(include))
@@ -0,0 +1,46 @@
+from typing import Iterable, Set
+
+from sqlalchemy import select, delete, insert, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+async def update_links(session: AsyncSession,
+                       owner_column: InstrumentedAttribute, target_column: InstrumentedAttribute,
+                       owner_id: int, target_ids: Iterable[int]) -> Set[int]:
+    # Bring many-to-many records of the owner to the given targets touching only the difference:
+    # stale (and duplicate) records are removed with a single DELETE, missing ones are added with a single INSERT.
+    # Returns ids of targets that were unlinked or linked
+    link_model = owner_column.class_
+    target_ids = list(dict.fromkeys(target_ids))
+    requested_ids = set(target_ids)
+
+    statement = select(link_model.id, target_column).where(owner_column == owner_id).order_by(link_model.id)
+    current_links = (await session.execute(statement)).all()
+
+    linked_ids = set()
+    unlinked_ids = set()
+    stale_links = []
+    for link_id, target_id in current_links:
+        if target_id in linked_ids or target_id not in requested_ids:
+            stale_links.append(link_id)
+            if target_id not in requested_ids:
+                unlinked_ids.add(target_id)
+        else:
+            linked_ids.add(target_id)
+
+    if len(stale_links) > 0:
+        statement = delete(link_model).where(link_model.id == any_(literal(stale_links, ARRAY(Integer))))
+        await session.execute(statement)
+
+    new_links = [
+        {
+            owner_column.key: owner_id,
+            target_column.key: target_id
+        } for target_id in target_ids if target_id not in linked_ids
+    ]
+    if len(new_links) > 0:
+        await session.execute(insert(link_model), new_links)
+
+    return unlinked_ids | {target_id for target_id in target_ids if target_id not in linked_ids}
@@ -0,0 +1,24 @@
+import base64
+import binascii
+import json
+from typing import List
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values) -> str:
+    # Cursor is an opaque url-safe representation of the last returned row keys
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid request payload. Malformed cursor"
+        )
+    return values
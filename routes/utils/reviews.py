@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import List, Tuple, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import Review, User
+from routes.utils.pagination import encode_cursor, decode_cursor
+
+# Number of reviews embedded into book document (the rest are fetched page by page)
+BOOK_REVIEWS_PAGE_SIZE = 20
+
+
+async def select_book_reviews(session: AsyncSession, book_id: int, limit: int,
+                              cursor: Union[None, str] = None) -> Tuple[List[Tuple[Review, User]], Union[None, str]]:
+    # Select page of book reviews with corresponding users, newest first
+    # (review id is used as a tie-breaker for keyset pagination)
+    statement = select(Review, User).outerjoin(User, Review.user_id == User.id).where(Review.book_id == book_id)
+
+    # Continue from the last review of the previous page
+    if cursor is not None:
+        last_created, last_id = decode_cursor(cursor, 2)
+        try:
+            last_created = datetime.fromisoformat(last_created)
+        except (TypeError, ValueError):
+            last_created = None
+        if last_created is None or not isinstance(last_id, int):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid request payload. Malformed cursor"
+            )
+        statement = statement.where(tuple_(Review.created, Review.id) < tuple_(last_created, last_id))
+
+    # Select one extra review to find out whether the next page exists
+    statement = statement.order_by(Review.created.desc(), Review.id.desc()).limit(limit + 1)
+    reviews_to_users = (await session.execute(statement)).all()
+    next_cursor = None
+    if len(reviews_to_users) > limit:
+        reviews_to_users = reviews_to_users[:limit]
+        last_review, _ = reviews_to_users[-1]
+        next_cursor = encode_cursor(last_review.created.isoformat(), last_review.id)
+
+    return reviews_to_users, next_cursor
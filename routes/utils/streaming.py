@@ -0,0 +1,33 @@
+from typing import AsyncIterator, Sequence
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Row, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Number of rows fetched from server-side cursor at once (bounds memory of a streamed response)
+STREAM_BATCH_SIZE = 500
+
+
+def accepts_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def stream_partitions(session: AsyncSession, statement: Select) -> AsyncIterator[Sequence[Row]]:
+    # Rows are read through a server-side cursor, so only a single batch is held in memory
+    result = await session.stream(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for partition in result.partitions():
+        yield partition
+
+
+def ndjson_response(records: AsyncIterator[BaseModel]) -> StreamingResponse:
+    # Every record is written as a separate JSON line as soon as it is ready
+    async def lines():
+        async for record in records:
+            yield record.model_dump_json(exclude_unset=True) + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)